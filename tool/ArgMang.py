@@ -230,6 +230,24 @@ class ArgumentFlavorInt(ArgumentFlavor):
 		return toRet
 
 
+class ArgumentFlavorMemory(ArgumentFlavorInt):
+	def manpageSynopMang(self,argD):
+		return "\\fB" + manSan(argD.sigils[0]) + "\\fR \\fISIZE\\fR"
+	def makeArgGUI(self,forGui,argD):
+		theNam = tkinter.Label(forGui.myCanvas, text = argD.name)
+		theNam.grid(column = 0, row = forGui.gridR)
+		theBox = tkinter.Entry(forGui.myCanvas)
+		theBox.grid(column = 1, row = forGui.gridR)
+		theBox.delete(0, tkinter.END)
+		initValue = struct.unpack(">q", argD.extras[0:8])[0]
+		theBox.insert(0, whodunargs.formatMemorySize(initValue))
+		theLab = tkinter.Label(forGui.myCanvas, text = argD.summary)
+		theLab.grid(column = 3, row = forGui.gridR)
+		forGui.gridR = forGui.gridR + 1
+		forGui.argPassFlavs.append(self)
+		forGui.argPassCaps.append([argD, theNam, theBox, theLab])
+
+
 class ArgumentFlavorIntVec(ArgumentFlavor):
 	def manpageSynopMang(self,argD):
 		return "[\\fB" + manSan(argD.sigils[0]) + "\\fR \\fI###\\fR]*"
@@ -732,6 +750,7 @@ argFlavorMap = {}
 argFlavorMap[("flag","")] = ArgumentFlavorFlag()
 argFlavorMap[("enum","")] = ArgumentFlavorEnum()
 argFlavorMap[("int","")] = ArgumentFlavorInt()
+argFlavorMap[("int","memory")] = ArgumentFlavorMemory()
 argFlavorMap[("intvec","")] = ArgumentFlavorIntVec()
 argFlavorMap[("intvecg","")] = ArgumentFlavorIntGreedVec()
 argFlavorMap[("float","")] = ArgumentFlavorFloat()
@@ -0,0 +1,482 @@
+import io
+import os
+import sys
+import array
+import math
+import time
+import tempfile
+import tracemalloc
+
+import whodunargs
+
+
+class BenchProgram(whodunargs.StandardProgram):
+	'''A program with a lot of options, to parse with.'''
+	def __init__(self, numOpt = 10):
+		'''
+		Set up the program.
+		@param numOpt: The number of options of each kind to add.
+		'''
+		whodunargs.StandardProgram.__init__(self)
+		self.name = "bench"
+		self.summary = "Something to benchmark parsing with."
+		self.useOut = io.BytesIO()
+		self.useErr = io.BytesIO()
+		# the named files do not exist: time the parsing, not the error path
+		self.checkFileSystem = False
+		for i in range(numOpt):
+			self.options.append(whodunargs.ArgumentOptionFlag("--flag" + str(i), "Flag " + str(i), "A flag."))
+			self.options.append(whodunargs.ArgumentOptionInteger("--int" + str(i), "Integer " + str(i), "An integer.", "--int" + str(i) + " 1"))
+			self.options.append(whodunargs.ArgumentOptionFileReadVector("--in" + str(i), "Input " + str(i), "Some inputs.", "--in" + str(i) + " a.tsv"))
+		self.intgOpt = whodunargs.ArgumentOptionIntegerGreedyVector("--ints", "Integers", "Lots of integers.", "--ints 1 2 3")
+		self.options.append(self.intgOpt)
+		self.strgOpt = whodunargs.ArgumentOptionFileReadGreedyVector("--files", "Files", "Lots of files.", "--files a.tsv b.tsv")
+		self.options.append(self.strgOpt)
+	def baseRun(self):
+		return
+
+
+class BenchProgramSet(whodunargs.StandardProgramSet):
+	'''A program set to parse with.'''
+	def __init__(self):
+		whodunargs.StandardProgramSet.__init__(self)
+		self.name = "benchset"
+		self.summary = "Something to benchmark program sets with."
+		self.programs["bench"] = lambda : BenchProgram()
+
+
+def timeOperation(prepFun, opFun, numRep):
+	'''
+	Time something.
+	@param prepFun: Make the thing to pass to the operation: not timed.
+	@param opFun: The operation to time.
+	@param numRep: The number of times to repeat.
+	@return: The best time in seconds, and the peak traced memory in bytes.
+	'''
+	bestTime = math.inf
+	for i in range(numRep):
+		opData = prepFun()
+		startT = time.perf_counter()
+		opFun(opData)
+		bestTime = min(bestTime, time.perf_counter() - startT)
+	opData = prepFun()
+	tracemalloc.start()
+	opFun(opData)
+	peakMem = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	return (bestTime, peakMem)
+
+
+def scalingExponent(sizes, times):
+	'''
+	Fit time = c * size^k on a log-log scale.
+	@param sizes: The problem sizes.
+	@param times: The time for each size.
+	@return: The fit exponent k.
+	'''
+	logS = [math.log(s) for s in sizes]
+	logT = [math.log(max(t, 1e-9)) for t in times]
+	meanS = sum(logS) / len(logS)
+	meanT = sum(logT) / len(logT)
+	numer = sum((logS[i] - meanS)*(logT[i] - meanT) for i in range(len(logS)))
+	denom = sum((s - meanS)*(s - meanS) for s in logS)
+	return numer / denom
+
+
+def fixedVectorArgs(numArg):
+	argL = []
+	for i in range(numArg // 2):
+		argL.append("--in" + str(i % 10))
+		argL.append("file" + str(i) + ".tsv")
+	return argL
+
+
+def greedyIntArgs(numArg):
+	return ["--ints"] + [str(i) for i in range(numArg - 1)]
+
+
+def greedyFileArgs(numArg):
+	return ["--files"] + ["file" + str(i) + ".tsv" for i in range(numArg - 1)]
+
+
+def mixedArgs(numArg, numOpt):
+	argL = []
+	i = 0
+	while len(argL) < numArg:
+		optI = str((i * 7919) % numOpt)
+		argL.append("--flag" + optI)
+		argL.append("--int" + optI)
+		argL.append(str(i))
+		i = i + 1
+	return argL
+
+
+benchCorpus = [fixedVectorArgs(20), greedyIntArgs(20), greedyFileArgs(20), mixedArgs(20, 10), ["--ints", "1", "--flag3", "--files", "a.tsv"]]
+'''Argument lists to check the compiled benchmark parser against the generic one with.'''
+
+class ParseBenchmarkProgram(whodunargs.StandardProgram):
+	'''Benchmark argument parsing.'''
+	def __init__(self):
+		whodunargs.StandardProgram.__init__(self)
+		self.name = "parse"
+		self.summary = "Benchmark argument parsing, and check that it scales linearly."
+		self.usage = "python3 WDABenchmark.py parse --argcount 10 1000 100000"
+		self.version = "WDABenchmark 0.0\nCopyright (C) 2023 Benjamin Crysup\nLicense LGPLv3: GNU LGPL version 3\nThis is free software: you are free to change and redistribute it.\nThere is NO WARRANTY, to the extent permitted by law.\n"
+		self.argcOpt = whodunargs.ArgumentOptionIntegerGreedyVector("--argcount","Argument Counts","The numbers of arguments to parse.","--argcount 10 1000 100000")
+		self.options.append(self.argcOpt)
+		self.optcOpt = whodunargs.ArgumentOptionIntegerGreedyVector("--optcount","Option Counts","The numbers of options to have.","--optcount 10 100 1000")
+		self.options.append(self.optcOpt)
+		self.repOpt = whodunargs.ArgumentOptionInteger("--repeat","Repeats","The number of times to repeat each measurement.","--repeat 3")
+		self.repOpt.value = 3
+		self.options.append(self.repOpt)
+		self.expOpt = whodunargs.ArgumentOptionFloat("--maxexp","Maximum Exponent","Fail if any operation scales worse than size to this power.","--maxexp 1.25")
+		self.expOpt.value = 1.25
+		self.options.append(self.expOpt)
+		self.compOpt = whodunargs.ArgumentOptionFlag("--compiled","Compiled","Also benchmark compiled parsers.")
+		self.options.append(self.compOpt)
+		self.filecOpt = whodunargs.ArgumentOptionInteger("--filecount","Checked File Limit","The most real files to make, for timing the file system checks.","--filecount 10000")
+		self.filecOpt.value = 10000
+		self.options.append(self.filecOpt)
+	def idiotCheck(self):
+		if len(self.argcOpt.value) == 0:
+			self.argcOpt.value.extend([10, 100, 1000, 10000, 100000, 1000000])
+		if len(self.optcOpt.value) == 0:
+			self.optcOpt.value.extend([10, 100, 1000, 10000])
+		if (len(self.argcOpt.value) < 2) or (len(self.optcOpt.value) < 2):
+			raise ValueError("Need at least two sizes to measure scaling.")
+		if min(self.argcOpt.value + self.optcOpt.value) < 2:
+			raise ValueError("Sizes must be at least two.")
+		if self.repOpt.value <= 0:
+			raise ValueError("Need at least one repeat.")
+	def measure(self, opName, sizes, prepFun, opFun):
+		'''
+		Measure an operation over a range of sizes.
+		@param opName: The name of the operation.
+		@param sizes: The sizes to run at.
+		@param prepFun: Set up for a size: takes the size.
+		@param opFun: The operation to run: takes the result of prepFun.
+		@return: The scaling exponent.
+		'''
+		allTime = []
+		for size in sizes:
+			curTime, curMem = timeOperation(lambda : prepFun(size), opFun, self.repOpt.value)
+			allTime.append(curTime)
+			opsPerSec = size / max(curTime, 1e-9)
+			self.useOut.write(bytes(opName + "\t" + str(size) + "\t" + ("%.1f" % opsPerSec) + "\t" + str(curMem // 1024) + "\n", "utf-8"))
+		curExp = scalingExponent(sizes, allTime)
+		self.useOut.write(bytes(opName + "\texponent\t" + ("%.3f" % curExp) + "\n", "utf-8"))
+		return curExp
+	def baseRun(self):
+		argCs = sorted(self.argcOpt.value)
+		optCs = sorted(self.optcOpt.value)
+		self.useOut.write(bytes("operation\tsize\tsize/sec\tpeakKiB\n", "utf-8"))
+		allExp = []
+		# argument count
+		argSets = [("fixed", fixedVectorArgs), ("greedyint", greedyIntArgs), ("greedyfile", greedyFileArgs)]
+		for setName, setFun in argSets:
+			allExp.append(("parse_" + setName, self.measure("parse_" + setName, argCs, lambda size: (BenchProgram(), setFun(size)), lambda pd: pd[0].parse(pd[1]))))
+			if self.compOpt.value:
+				def prepCompiled(size):
+					retProg = BenchProgram()
+					retProg.compile(benchCorpus)
+					return (retProg, setFun(size))
+				allExp.append(("compiled_" + setName, self.measure("compiled_" + setName, argCs, prepCompiled, lambda pd: pd[0].parse(pd[1]))))
+		# the file system checks, on files that exist
+		fileCs = [size for size in argCs if size <= self.filecOpt.value]
+		if len(fileCs) >= 2:
+			with tempfile.TemporaryDirectory() as tempDir:
+				realFiles = []
+				for i in range(max(fileCs) - 1):
+					realFiles.append(os.path.join(tempDir, "file" + str(i) + ".tsv"))
+					open(realFiles[-1], "wb").close()
+				def prepChecked(size):
+					retProg = BenchProgram()
+					retProg.checkFileSystem = True
+					return (retProg, ["--files"] + realFiles[:(size - 1)])
+				def parseChecked(pd):
+					pd[0].parse(pd[1])
+					if pd[0].wasError:
+						raise ValueError("Checked parse failed: " + str(pd[0].useErr.getvalue(), "utf-8"))
+				allExp.append(("parse_checkedfiles", self.measure("parse_checkedfiles", fileCs, prepChecked, parseChecked)))
+		allExp.append(("programset_greedyfile", self.measure("programset_greedyfile", argCs, lambda size: (BenchProgramSet(), ["bench"] + greedyFileArgs(size)), lambda pd: pd[0].parseArguments(pd[1], useOut = io.BytesIO(), useErr = io.BytesIO()))))
+		# option count: parse time should not depend on it at all
+		allExp.append(("parse_options", self.measure("parse_options", optCs, lambda size: (BenchProgram(size), mixedArgs(1000, size)), lambda pd: pd[0].parse(pd[1]))))
+		allExp.append(("idiotcheck_options", self.measure("idiotcheck_options", optCs, lambda size: BenchProgram(size), lambda prog: prog.idiotCheckArguments())))
+		allExp.append(("dump_options", self.measure("dump_options", optCs, lambda size: BenchProgram(size), lambda prog: prog.dumpArguments(io.BytesIO()))))
+		# complain about anything superlinear
+		badOps = [opN for opN, opE in allExp if opE > self.expOpt.value]
+		if len(badOps) > 0:
+			raise ValueError("Superlinear scaling in: " + ", ".join(badOps))
+
+
+class ConformDefineOption(whodunargs.ArgumentOption):
+	'''An option with its own canParse (-Dname=value), which the compiled parser cannot inline.'''
+	def __init__(self):
+		whodunargs.ArgumentOption.__init__(self)
+		self.name = "Define"
+		self.sigils = ["-D"]
+		self.summary = "Define a name."
+		self.usage = "-Dname=value"
+		self.typeCode = "meta"
+		self.value = []
+	def canParse(self, forArgs):
+		return forArgs[0].startswith("-D")
+	def parseAt(self, forArgs, atInd, forProg):
+		self.value.append(forArgs[atInd][2:])
+		return atInd + 1
+
+
+class ConformProgram(whodunargs.StandardProgram):
+	'''A program with one of every kind of option, to check compiled parsers against.'''
+	def __init__(self):
+		whodunargs.StandardProgram.__init__(self)
+		self.name = "conformtarget"
+		self.summary = "Something to check compiled parsers with."
+		self.enumVal = whodunargs.ArgumentOptionEnumValue("radio")
+		self.options.append(whodunargs.ArgumentOptionFlag("--bye","Test Flag","Test Flag"))
+		self.options.append(whodunargs.ArgumentOptionEnum("--doa", "Enum A", "The first enum value.", self.enumVal))
+		self.options.append(whodunargs.ArgumentOptionEnum("--dob", "Enum B", "The second enum value.", self.enumVal))
+		self.options.append(whodunargs.ArgumentOptionEnum("--doc", "Enum C", "The third enum value.", self.enumVal))
+		self.options.append(whodunargs.ArgumentOptionInteger("--qual","Quality","An integer.","--qual 20"))
+		self.options.append(whodunargs.ArgumentOptionFloat("--pow","Power","A float.","--pow 1.0"))
+		self.options.append(whodunargs.ArgumentOptionString("--name","Name","A string.","--name abc"))
+		intvOpt = whodunargs.ArgumentOptionIntegerVector("--dims","Dimensions","An integer vector.","--dims 10")
+		intvOpt.useArrayStorage()
+		self.options.append(intvOpt)
+		self.options.append(whodunargs.ArgumentOptionFloatVector("--cols","Collisions","A float vector.","--cols 0.4"))
+		self.options.append(whodunargs.ArgumentOptionStringVector("--tags","Tags","A string vector.","--tags bad"))
+		filerOpt = whodunargs.ArgumentOptionFileRead("--in","Input","A file read.","--in in.tsv")
+		filerOpt.validExts.add(".tsv")
+		self.options.append(filerOpt)
+		filewOpt = whodunargs.ArgumentOptionFileWrite("--out","Output","A file write.","--out out.csv")
+		filewOpt.validExts.add(".csv")
+		self.options.append(filewOpt)
+		self.options.append(whodunargs.ArgumentOptionFolderRead("--builddir","Build Directory","A folder read.","--builddir ."))
+		self.options.append(whodunargs.ArgumentOptionFolderWrite("--workd","Working Directory","A folder write.","--workd ."))
+		refsOpt = whodunargs.ArgumentOptionFileReadVector("--refs","References","A file read vector.","--refs in.bmp")
+		refsOpt.useStringTable(True)
+		self.options.append(refsOpt)
+		self.options.append(whodunargs.ArgumentOptionFileWriteVector("--logs","Log Output","A file write vector.","--logs out.midi"))
+		self.options.append(whodunargs.ArgumentOptionIntegerGreedyVector("--ints", "Integers", "A greedy integer vector.", "--ints 1 2 3"))
+		fltgOpt = whodunargs.ArgumentOptionFloatGreedyVector("--flts", "Floats", "A greedy float vector.", "--flts 1 2.5")
+		fltgOpt.useArrayStorage()
+		self.options.append(fltgOpt)
+		self.options.append(whodunargs.ArgumentOptionStringGreedyVector("--strs", "Strings", "A greedy string vector.", "--strs a b"))
+		self.options.append(whodunargs.ArgumentOptionFileReadGreedyVector("--files", "Files", "A greedy file read vector.", "--files a.tsv b.tsv"))
+		self.options.append(whodunargs.ArgumentOptionThreadcount())
+		self.options.append(whodunargs.ArgumentOptionThreadgrain())
+		self.options.append(whodunargs.ArgumentOptionSchedule())
+		self.options.append(whodunargs.ArgumentOptionMemoryBudget())
+		self.options.append(whodunargs.ArgumentOptionAffinity())
+		self.options.append(whodunargs.ArgumentOptionPrefetch())
+	def baseRun(self):
+		return
+
+
+class ConformCustomProgram(ConformProgram):
+	'''The conformance program, plus an option with its own canParse.'''
+	def __init__(self):
+		ConformProgram.__init__(self)
+		self.defOpt = ConformDefineOption()
+		self.options.append(self.defOpt)
+
+
+conformCorpus = [
+	[],
+	["--bye"],
+	["--doa"],
+	["--dob", "--doc"],
+	["--qual", "7", "--pow", "2.5", "--name", "xyz"],
+	["--qual", "-3", "--qual", "4", "--name", "--bye"],
+	["--dims", "1", "--dims", "2", "--cols", "0.5", "--tags", "a", "--tags", "b"],
+	["--in", "a.tsv", "--out", "b.csv", "--builddir", ".", "--workd", "."],
+	["--in", "a.txt"],
+	["--refs", "/data/a.bmp", "--refs", "/data/b.bmp", "--logs", "c.midi"],
+	["--ints", "1", "2", "3", "--flts", "1.5", "2", "-7e3", "--strs", "a", "b", "--bye"],
+	["--ints", "1", "x"],
+	["--ints", "--bye"],
+	["--files", "a.tsv", "b.tsv", "--files", "c.tsv"],
+	["--thread", "auto", "--threadgrain", "auto"],
+	["--thread", "3", "--threadgrain", "100", "--schedule", "guided"],
+	["--thread", "0"],
+	["--schedule", "sideways"],
+	["--memory", "512M"],
+	["--memory", "1.5GiB", "--memory", "0"],
+	["--memory", "lots"],
+	["--affinity", "compact", "--prefetch", "4"],
+	["--qual"],
+	["--qual", "abc"],
+	["--pow", "1e400"],
+	["--unknown"],
+	["--help_id10t", "--qual", "3"],
+	["--help_shard", "0/2", "--refs", "a", "--refs", "b", "--refs", "c", "--files", "d", "e"],
+	["--help_shard", "2/2"],
+	["--version"],
+	["--help"],
+	["--help_argdump"],
+]
+'''Argument lists to check compiled parsers against the generic parser with.'''
+
+conformCustomCorpus = [
+	["-DFOO=1", "--qual", "2", "-DBAR=x"],
+	["--ints", "1", "2", "-Dn=3"],
+	["-D"],
+]
+'''Argument lists for the program with its own canParse.'''
+
+
+class ConformBenchmarkProgram(whodunargs.StandardProgram):
+	'''Check compiled parsers against the generic parser.'''
+	def __init__(self):
+		whodunargs.StandardProgram.__init__(self)
+		self.name = "conform"
+		self.summary = "Check that compiled parsers do the same thing as the generic parser."
+		self.usage = "python3 WDABenchmark.py conform"
+		self.version = "WDABenchmark 0.0\nCopyright (C) 2023 Benjamin Crysup\nLicense LGPLv3: GNU LGPL version 3\nThis is free software: you are free to change and redistribute it.\nThere is NO WARRANTY, to the extent permitted by law.\n"
+	def baseRun(self):
+		# compile raises if the compiled parser disagrees on any case
+		testProg = ConformProgram()
+		testProg.compile(conformCorpus)
+		if testProg.compiledParse is None:
+			raise ValueError("Conformance program did not compile.")
+		self.useOut.write(bytes("compiled\t" + str(len(conformCorpus)) + " cases agree\n", "utf-8"))
+		# anything with its own canParse has to use the generic parser
+		testProg = ConformCustomProgram()
+		testProg.compile(conformCustomCorpus)
+		if testProg.compiledParse is not None:
+			raise ValueError("Compiled a program with its own canParse.")
+		for curArgs in conformCustomCorpus:
+			testProg = ConformCustomProgram()
+			testProg.useOut = io.BytesIO()
+			testProg.useErr = io.BytesIO()
+			testProg.parse(curArgs)
+			wantDefs = [arg[2:] for arg in curArgs if arg.startswith("-D")]
+			if testProg.wasError or (testProg.defOpt.value != wantDefs):
+				raise ValueError("Custom option misparsed: " + " ".join(curArgs))
+		self.useOut.write(bytes("custom\t" + str(len(conformCustomCorpus)) + " cases use the generic parser\n", "utf-8"))
+
+
+cgroupCases = [
+	("v2 quota", "0::/\n", {"cpu.max": "200000 100000"}, {}, 8, 2.0, 2),
+	("v2 no quota", "0::/\n", {"cpu.max": "max 100000"}, {}, 8, None, 8),
+	("v2 nested", "0::/user.slice/job\n", {"cpu.max": "max 100000", "user.slice/cpu.max": "300000 100000", "user.slice/job/cpu.max": "150000 100000"}, {}, 8, 1.5, 2),
+	("v2 parent tighter", "0::/user.slice/job\n", {"user.slice/cpu.max": "100000 100000", "user.slice/job/cpu.max": "400000 100000"}, {}, 8, 1.0, 1),
+	("v2 hybrid", "0::/job\n1:cpu,cpuacct:/job\n", {"unified/job/cpu.max": "300000 100000"}, {}, 8, 3.0, 3),
+	("v2 fraction", "0::/\n", {"cpu.max": "50000 100000"}, {}, 8, 0.5, 1),
+	("v2 garbage", "0::/\n", {"cpu.max": "lots 0"}, {}, 8, None, 8),
+	("v1 quota", "4:cpu,cpuacct:/docker/abc\n", {"cpu,cpuacct/docker/abc/cpu.cfs_quota_us": "250000", "cpu,cpuacct/docker/abc/cpu.cfs_period_us": "100000"}, {}, 8, 2.5, 3),
+	("v1 no quota", "4:cpu,cpuacct:/docker/abc\n", {"cpu,cpuacct/docker/abc/cpu.cfs_quota_us": "-1", "cpu,cpuacct/docker/abc/cpu.cfs_period_us": "100000"}, {}, 8, None, 8),
+	("v1 namespaced", "4:cpu:/docker/abc\n", {"cpu/cpu.cfs_quota_us": "200000", "cpu/cpu.cfs_period_us": "100000"}, {}, 8, 2.0, 2),
+	("no cgroups", "", {}, {}, 8, None, 8),
+	("affinity", "0::/\n", {}, {}, 2, None, 2),
+	("slurm", "0::/\n", {}, {"SLURM_CPUS_PER_TASK": "3"}, 8, None, 3),
+	("sge under quota", "0::/\n", {"cpu.max": "200000 100000"}, {"NSLOTS": "4"}, 8, 2.0, 2),
+	("pbs", "", {}, {"PBS_NUM_PPN": "5", "NCPUS": "6"}, 8, None, 5),
+	("bad variables", "", {}, {"SLURM_CPUS_PER_TASK": "many", "LSB_DJOB_NUMPROC": "0"}, 8, None, 8),
+]
+'''Fake cgroup setups: name, /proc/self/cgroup, files under the cgroup root, environment, number of cpus in the affinity set, expected quota and expected cpu count.'''
+
+
+class CgroupBenchmarkProgram(whodunargs.StandardProgram):
+	'''Check cpu detection against fake cgroup trees and batch scheduler variables.'''
+	def __init__(self):
+		whodunargs.StandardProgram.__init__(self)
+		self.name = "cgroup"
+		self.summary = "Check that --thread auto finds the right number of cpus under cgroups and batch schedulers."
+		self.usage = "python3 WDABenchmark.py cgroup"
+		self.version = "WDABenchmark 0.0\nCopyright (C) 2023 Benjamin Crysup\nLicense LGPLv3: GNU LGPL version 3\nThis is free software: you are free to change and redistribute it.\nThere is NO WARRANTY, to the extent permitted by law.\n"
+	def baseRun(self):
+		self.useOut.write(bytes("case\tquota\tcpus\n", "utf-8"))
+		for caseName, procText, cgroupFiles, caseEnv, numAff, wantQuota, wantCount in cgroupCases:
+			with tempfile.TemporaryDirectory() as tempDir:
+				cgroupRoot = os.path.join(tempDir, "cgroup")
+				os.makedirs(cgroupRoot)
+				for filePath, fileText in cgroupFiles.items():
+					fullPath = os.path.join(cgroupRoot, filePath)
+					os.makedirs(os.path.dirname(fullPath), exist_ok = True)
+					with open(fullPath, "w") as outF:
+						outF.write(fileText + "\n")
+				procCgroup = os.path.join(tempDir, "cgroup.txt")
+				with open(procCgroup, "w") as outF:
+					outF.write(procText)
+				gotQuota = whodunargs.cgroupCpuLimit(cgroupRoot, procCgroup)
+				gotCount = whodunargs.detectCpuCount(cgroupRoot, procCgroup, caseEnv, set(range(numAff)))
+			self.useOut.write(bytes(caseName + "\t" + str(gotQuota) + "\t" + str(gotCount) + "\n", "utf-8"))
+			if (gotQuota != wantQuota) or (gotCount != wantCount):
+				raise ValueError("Wrong cpus for " + caseName + ": wanted quota " + str(wantQuota) + " and " + str(wantCount) + " cpus.")
+
+
+def _pickledChunkSum(chunkInfo):
+	chunkData, chunkI, numChunk = chunkInfo
+	chunkS = (chunkI * len(chunkData)) // numChunk
+	chunkE = ((chunkI + 1) * len(chunkData)) // numChunk
+	return sum(chunkData[chunkS:chunkE])
+
+
+def _sharedChunkSum(chunkInfo):
+	chunkI, numChunk = chunkInfo
+	chunkData = whodunargs.sharedInput("values")
+	chunkS = (chunkI * len(chunkData)) // numChunk
+	chunkE = ((chunkI + 1) * len(chunkData)) // numChunk
+	return sum(chunkData[chunkS:chunkE])
+
+
+class SharedBenchmarkProgram(whodunargs.StandardProgram):
+	'''Benchmark sharing inputs with process workers.'''
+	def __init__(self):
+		whodunargs.StandardProgram.__init__(self)
+		self.name = "shared"
+		self.summary = "Compare handing a large input to process workers through shared memory against pickling it."
+		self.usage = "python3 WDABenchmark.py shared --count 10000000 --thread 4"
+		self.version = "WDABenchmark 0.0\nCopyright (C) 2023 Benjamin Crysup\nLicense LGPLv3: GNU LGPL version 3\nThis is free software: you are free to change and redistribute it.\nThere is NO WARRANTY, to the extent permitted by law.\n"
+		self.countOpt = whodunargs.ArgumentOptionInteger("--count","Value Count","The number of integers in the shared input.","--count 10000000")
+		self.countOpt.value = 10000000
+		self.options.append(self.countOpt)
+		self.chunkOpt = whodunargs.ArgumentOptionInteger("--chunks","Chunk Count","The number of tasks to split the work into.","--chunks 16")
+		self.chunkOpt.value = 16
+		self.options.append(self.chunkOpt)
+		self.threadOpt = whodunargs.ArgumentOptionThreadcount()
+		self.threadOpt.value = 4
+		self.options.append(self.threadOpt)
+	def idiotCheck(self):
+		if (self.countOpt.value <= 0) or (self.chunkOpt.value <= 0):
+			raise ValueError("Need a positive count and number of chunks.")
+	def baseRun(self):
+		allVals = array.array("q", range(self.countOpt.value))
+		numChunk = self.chunkOpt.value
+		wantSum = sum(allVals)
+		self.useOut.write(bytes("method\tseconds\n", "utf-8"))
+		# pickle it with every task
+		startT = time.perf_counter()
+		gotSum = sum(self.mapChunked(_pickledChunkSum, [(allVals, i, numChunk) for i in range(numChunk)], 1, True))
+		pickleT = time.perf_counter() - startT
+		if gotSum != wantSum:
+			raise ValueError("Pickled workers got the wrong answer.")
+		self.useOut.write(bytes("pickle\t" + ("%.4f" % pickleT) + "\n", "utf-8"))
+		# share it once (includes the copy into shared memory, and starting a new pool)
+		startT = time.perf_counter()
+		self.shareInput("values", allVals)
+		gotSum = sum(self.mapChunked(_sharedChunkSum, [(i, numChunk) for i in range(numChunk)], 1, True))
+		shareT = time.perf_counter() - startT
+		if gotSum != wantSum:
+			raise ValueError("Shared workers got the wrong answer.")
+		self.useOut.write(bytes("shared\t" + ("%.4f" % shareT) + "\n", "utf-8"))
+
+
+class WDABenchmarkSet(whodunargs.StandardProgramSet):
+	def __init__(self):
+		whodunargs.StandardProgramSet.__init__(self)
+		self.name = "WDABenchmark"
+		self.summary = "Benchmarks for whodunargs."
+		self.version = "WDABenchmark 0.0\nCopyright (C) 2023 Benjamin Crysup\nLicense LGPLv3: GNU LGPL version 3\nThis is free software: you are free to change and redistribute it.\nThere is NO WARRANTY, to the extent permitted by law.\n"
+		self.programs["parse"] = lambda : ParseBenchmarkProgram()
+		self.programs["shared"] = lambda : SharedBenchmarkProgram()
+		self.programs["conform"] = lambda : ConformBenchmarkProgram()
+		self.programs["cgroup"] = lambda : CgroupBenchmarkProgram()
+
+
+if __name__ == "__main__":
+	toRun = WDABenchmarkSet()
+	toRun = toRun.parseArguments(sys.argv[1:])
+	if not (toRun is None):
+		toRun.run()
@@ -1,8 +1,130 @@
 '''Code for parsing/documenting arguments.'''
 
+import io
+import os
 import sys
+import atexit
+import math
+import time
+import stat
 import struct
+import array
+import heapq
+import queue
+import zlib
+import codecs
 import traceback
+import itertools
+import threading
+import collections
+import collections.abc
+
+class ArgumentSlice(collections.abc.Sequence):
+	'''The tail of an argument list, without copying it.'''
+	def __init__(self, baseArgs, startInd):
+		'''
+		Set up a view.
+		@param baseArgs: The full argument list.
+		@param startInd: The index of the first argument in the view.
+		'''
+		self.baseArgs = baseArgs
+		'''The full argument list.'''
+		self.startInd = min(startInd, len(baseArgs))
+		'''The index of the first argument in the view.'''
+	def __len__(self):
+		return len(self.baseArgs) - self.startInd
+	def __getitem__(self, ind):
+		if isinstance(ind, slice):
+			sliceS, sliceE, sliceI = ind.indices(len(self))
+			if (sliceI == 1) and (sliceE >= len(self)):
+				return ArgumentSlice(self.baseArgs, self.startInd + sliceS)
+			return [self.baseArgs[self.startInd + i] for i in range(sliceS, sliceE, sliceI)]
+		if ind < 0:
+			ind = ind + len(self)
+		if (ind < 0) or (ind >= len(self)):
+			raise IndexError("Argument index out of range.")
+		return self.baseArgs[self.startInd + ind]
+	def __eq__(self, other):
+		if not isinstance(other, collections.abc.Sequence):
+			return NotImplemented
+		return (len(self) == len(other)) and all(a == b for a, b in zip(self, other))
+	__hash__ = None
+	def __repr__(self):
+		return repr(list(self))
+
+
+class ArgumentStringTable(collections.abc.Sequence):
+	'''A compact list of strings: one utf-8 buffer and an array of end offsets.'''
+	def __init__(self, prefixShare = False):
+		'''
+		Set up an empty table.
+		@param prefixShare: Whether to store directory prefixes once, and only keep the rest of each string.
+		'''
+		self.textData = bytearray()
+		'''The text of the strings (without any shared prefix), back to back.'''
+		self.textEnds = array.array("Q")
+		'''Where each string ends in the text.'''
+		self.prefixShare = prefixShare
+		'''Whether directory prefixes are shared.'''
+		self.prefixIDs = array.array("I")
+		'''The prefix of each string, if sharing prefixes.'''
+		self.prefixes = []
+		'''The distinct prefixes.'''
+		self.prefixMap = {}
+		'''The index of each prefix.'''
+	def append(self, newStr):
+		'''
+		Add a string to the end.
+		@param newStr: The string to add.
+		'''
+		if self.prefixShare:
+			splitI = max(newStr.rfind("/"), newStr.rfind(os.sep)) + 1
+			curPref = newStr[:splitI]
+			prefI = self.prefixMap.get(curPref)
+			if prefI is None:
+				prefI = len(self.prefixes)
+				self.prefixes.append(curPref)
+				self.prefixMap[curPref] = prefI
+			self.prefixIDs.append(prefI)
+			newStr = newStr[splitI:]
+		self.textData.extend(newStr.encode("utf-8", "surrogatepass"))
+		self.textEnds.append(len(self.textData))
+	def extend(self, newStrs):
+		'''
+		Add strings to the end.
+		@param newStrs: The strings to add.
+		'''
+		for curS in newStrs:
+			self.append(curS)
+	def __len__(self):
+		return len(self.textEnds)
+	def __getitem__(self, ind):
+		if isinstance(ind, slice):
+			return [self[i] for i in range(*ind.indices(len(self)))]
+		if ind < 0:
+			ind = ind + len(self)
+		if (ind < 0) or (ind >= len(self)):
+			raise IndexError("String table index out of range.")
+		textS = self.textEnds[ind-1] if (ind > 0) else 0
+		curS = str(self.textData[textS:self.textEnds[ind]], "utf-8", "surrogatepass")
+		if self.prefixShare:
+			curS = self.prefixes[self.prefixIDs[ind]] + curS
+		return curS
+	def __iter__(self):
+		for i in range(len(self)):
+			yield self[i]
+	def __eq__(self, other):
+		if not isinstance(other, collections.abc.Sequence):
+			return NotImplemented
+		return (len(self) == len(other)) and all(a == b for a, b in zip(self, other))
+	__hash__ = None
+	def __add__(self, other):
+		return list(self) + list(other)
+	def __radd__(self, other):
+		return list(other) + list(self)
+	def __repr__(self):
+		return "ArgumentStringTable(" + repr(list(self)) + ")"
+
 
 class ArgumentOption:
 	'''An argument to a program.'''
@@ -26,6 +148,10 @@ class ArgumentOption:
 		'''The primary type of this option.'''
 		self.extTypeCode = ""
 		'''The secondary type of this option.'''
+		self.shardable = False
+		'''Whether --help_shard should split the values of this option between runs.'''
+		self.shardWith = None
+		'''A shardable option whose values this one's pair up with (say outputs for inputs), so --help_shard keeps the same positions of both.'''
 	def canParse(self, forArgs):
 		'''
 		Get whether this can parse the first argument in a set.
@@ -40,12 +166,41 @@ class ArgumentOption:
 		@param forProg: The program this is parsing for.
 		@return: The remaining arguments.
 		'''
-		raise NotImplementedError("Use a subclass.")
+		if type(self).parseAt is ArgumentOption.parseAt:
+			raise NotImplementedError("Use a subclass.")
+		return forArgs[self.parseAt(forArgs, 0, forProg):]
+	def parseAt(self, forArgs, atInd, forProg):
+		'''
+		Parse some arguments, starting partway through without copying.
+		@param forArgs: All the arguments.
+		@param atInd: The index of the first argument to consider parsing.
+		@param forProg: The program this is parsing for.
+		@return: The index of the first argument not consumed.
+		'''
+		if type(self).parse is ArgumentOption.parse:
+			raise NotImplementedError("Use a subclass.")
+		# old style option: hand it a view instead of a copy
+		remArgs = self.parse(ArgumentSlice(forArgs, atInd), forProg)
+		if isinstance(remArgs, ArgumentSlice) and (remArgs.baseArgs is forArgs):
+			return remArgs.startInd
+		return len(forArgs) - len(remArgs)
 	def idiotCheck(self):
 		'''
 		Perform any special checks on an argument.
 		'''
 		return
+	def checkPaths(self):
+		'''
+		Get the file system paths this option will look at when checking.
+		@return: The paths to look up.
+		'''
+		return []
+	def idiotCheckPaths(self, statCache):
+		'''
+		Check this option against the file system.
+		@param statCache: Looked up info for the paths from checkPaths.
+		'''
+		return
 	def dumpInfo(self,toStr):
 		'''
 		Dump packed info on this thing.
@@ -108,11 +263,11 @@ class ArgumentOptionHelp(ArgumentOption):
 		self.extTypeCode = ""
 	def canParse(self, forArgs):
 		return (forArgs[0] == "--help") or (forArgs[0] == "-h") or (forArgs[0] == "/?")
-	def parse(self, forArgs, forProg):
+	def parseAt(self, forArgs, atInd, forProg):
 		forProg.needRun = False
 		forProg.needIdiot = False
 		forProg.printHelp(forProg.useOut)
-		return []
+		return len(forArgs)
 
 
 class ArgumentOptionVersion(ArgumentOption):
@@ -130,11 +285,11 @@ class ArgumentOptionVersion(ArgumentOption):
 		self.extTypeCode = ""
 	def canParse(self, forArgs):
 		return (forArgs[0] == "--version")
-	def parse(self, forArgs, forProg):
+	def parseAt(self, forArgs, atInd, forProg):
 		forProg.needRun = False
 		forProg.needIdiot = False
 		forProg.printVersion(forProg.useOut)
-		return []
+		return len(forArgs)
 
 
 class ArgumentOptionArgdump(ArgumentOption):
@@ -152,11 +307,11 @@ class ArgumentOptionArgdump(ArgumentOption):
 		self.extTypeCode = ""
 	def canParse(self, forArgs):
 		return (forArgs[0] == "--help_argdump")
-	def parse(self, forArgs, forProg):
+	def parseAt(self, forArgs, atInd, forProg):
 		forProg.needRun = False
 		forProg.needIdiot = False
 		forProg.dumpArguments(forProg.useOut)
-		return []
+		return len(forArgs)
 
 
 class ArgumentOptionIdiot(ArgumentOption):
@@ -174,9 +329,176 @@ class ArgumentOptionIdiot(ArgumentOption):
 		self.extTypeCode = ""
 	def canParse(self, forArgs):
 		return (forArgs[0] == "--help_id10t")
-	def parse(self, forArgs, forProg):
+	def parseAt(self, forArgs, atInd, forProg):
 		forProg.needRun = False
-		return forArgs[1:]
+		return atInd + 1
+
+
+class ArgumentOptionTiming(ArgumentOption):
+	'''Look for timing requests.'''
+	def __init__(self):
+		'''
+		Set up a timing option.
+		'''
+		ArgumentOption.__init__(self)
+		self.isCommon = False
+		self.name = "Timing"
+		self.sigils = ["--help_timing"]
+		self.summary = "Time how long each argument takes to set up, parse and check."
+		self.typeCode = "meta"
+		self.extTypeCode = ""
+	def canParse(self, forArgs):
+		return (forArgs[0] == "--help_timing")
+	def parseAt(self, forArgs, atInd, forProg):
+		if forProg.timings is None:
+			forProg.timings = ArgumentTimingLog()
+		return atInd + 1
+
+
+class ArgumentTimingLog:
+	'''Where time went while setting up a program.'''
+	def __init__(self):
+		'''
+		Set up an empty log.
+		'''
+		self.times = {}
+		'''The total time for each (name, phase), in seconds.'''
+		self.notes = []
+		'''Anything else of note, as (name, text).'''
+	def record(self, forName, forPhase, numSec):
+		'''
+		Note time spent on something.
+		@param forName: The name of the thing.
+		@param forPhase: What it was doing.
+		@param numSec: The number of seconds it took.
+		'''
+		curKey = (forName, forPhase)
+		self.times[curKey] = self.times.get(curKey, 0.0) + numSec
+	def note(self, forName, noteText):
+		'''
+		Note something other than a time.
+		@param forName: The name of the thing.
+		@param noteText: The thing to note.
+		'''
+		self.notes.append((forName, noteText))
+	def printTable(self, toStr):
+		'''
+		Print out the times, slowest first.
+		@param toStr: The place to write.
+		'''
+		toStr.write(bytes("Milliseconds\tPhase\tName\n", "utf-8"))
+		for curKey in sorted(self.times, key = lambda k: -self.times[k]):
+			toStr.write(bytes(("%.3f" % (1000.0 * self.times[curKey])) + "\t" + curKey[1] + "\t" + curKey[0] + "\n", "utf-8"))
+		for curNote in self.notes:
+			toStr.write(bytes("note\t" + curNote[0] + "\t" + curNote[1] + "\n", "utf-8"))
+
+
+class ArgumentOptionShard(ArgumentOption):
+	'''Look for requests to do only a share of the work.'''
+	shardModes = ("hash", "size")
+	'''The known ways to split things up.'''
+	def __init__(self):
+		'''
+		Set up a shard option.
+		'''
+		ArgumentOption.__init__(self)
+		self.isCommon = False
+		self.name = "Shard"
+		self.sigils = ["--help_shard"]
+		self.summary = "Only work on share i (counting from 0) of n: add :size to split files by size instead of by name."
+		self.usage = "--help_shard 3/100"
+		self.typeCode = "meta"
+		self.extTypeCode = ""
+		self.shardIndex = 0
+		'''The share to work on.'''
+		self.shardCount = None
+		'''The number of shares, or None if not sharding.'''
+		self.shardMode = "hash"
+		'''How to split things up.'''
+	def canParse(self, forArgs):
+		return (forArgs[0] == "--help_shard")
+	def parseAt(self, forArgs, atInd, forProg):
+		if (atInd + 1) >= len(forArgs):
+			raise IndexError("No value provided for " + self.name)
+		shardText, sepText, modeText = forArgs[atInd + 1].partition(":")
+		indText, sepText, countText = shardText.partition("/")
+		try:
+			shardIndex = int(indText)
+			shardCount = int(countText)
+		except ValueError:
+			raise ValueError("Shard should look like i/n, not " + forArgs[atInd + 1])
+		if len(modeText) == 0:
+			modeText = "hash"
+		if not (modeText in ArgumentOptionShard.shardModes):
+			raise ValueError("Unknown shard mode " + modeText)
+		if (shardCount <= 0) or (shardIndex < 0) or (shardIndex >= shardCount):
+			raise ValueError("Shard " + shardText + " is out of range.")
+		self.shardIndex = shardIndex
+		self.shardCount = shardCount
+		self.shardMode = modeText
+		return atInd + 2
+
+
+def shardIndices(allVals, shardIndex, shardCount, shardMode = "hash", statCache = None, numThread = 16):
+	'''
+	Pick out one share of some values, the same way every time (and on every machine).
+	Hash mode looks at nothing but the values. Size mode has to stat every file (not just this share) to balance the shares: the results stay in statCache, so checking the kept files later does not stat them again.
+	@param allVals: The values to split: a list, array or ArgumentStringTable.
+	@param shardIndex: The share to keep.
+	@param shardCount: The number of shares.
+	@param shardMode: hash (by the crc32 of each value) or size (files split by size, biggest first).
+	@param statCache: Looked up info on the files, for size.
+	@param numThread: The maximum number of stats to have going at once, for size.
+	@return: The indices of the values in the share, in order.
+	'''
+	if shardMode == "hash":
+		return [i for i in range(len(allVals)) if (zlib.crc32(str(allVals[i]).encode("utf-8", "surrogatepass")) % shardCount) == shardIndex]
+	else:
+		if statCache is None:
+			statCache = ArgumentStatCache()
+		statCache.prefetch([str(val) for val in allVals], numThread)
+		valSizes = []
+		for val in allVals:
+			valStat = statCache.stat(str(val))
+			valSizes.append(valStat.st_size if ((valStat is not None) and stat.S_ISREG(valStat.st_mode)) else 0)
+		loadHeap = [(0, si) for si in range(shardCount)]
+		keepInds = []
+		for i in sorted(range(len(allVals)), key = lambda i: (-valSizes[i], str(allVals[i]), i)):
+			curLoad, si = heapq.heappop(loadHeap)
+			if si == shardIndex:
+				keepInds.append(i)
+			heapq.heappush(loadHeap, (curLoad + valSizes[i], si))
+		keepInds.sort()
+		return keepInds
+
+
+def keepIndices(allVals, keepInds):
+	'''
+	Keep some of a set of values.
+	@param allVals: The values: a list, array or ArgumentStringTable.
+	@param keepInds: The indices to keep, in order.
+	@return: The kept values, stored the same way.
+	'''
+	if isinstance(allVals, array.array):
+		return array.array(allVals.typecode, (allVals[i] for i in keepInds))
+	if isinstance(allVals, ArgumentStringTable):
+		keepVals = ArgumentStringTable(allVals.prefixShare)
+		keepVals.extend(allVals[i] for i in keepInds)
+		return keepVals
+	return [allVals[i] for i in keepInds]
+
+
+def shardValues(allVals, shardIndex, shardCount, shardMode = "hash", statCache = None):
+	'''
+	Pick out one share of some values (see shardIndices).
+	@param allVals: The values to split: a list, array or ArgumentStringTable.
+	@param shardIndex: The share to keep.
+	@param shardCount: The number of shares.
+	@param shardMode: hash or size.
+	@param statCache: Looked up info on the files, for size.
+	@return: The values in the share, in their original order, stored the same way.
+	'''
+	return keepIndices(allVals, shardIndices(allVals, shardIndex, shardCount, shardMode, statCache))
 
 
 class ArgumentOptionNamed(ArgumentOption):
@@ -210,9 +532,9 @@ class ArgumentOptionFlag(ArgumentOptionNamed):
 		self.extTypeCode = ""
 		self.value = False
 		'''The parsed value of this option.'''
-	def parse(self, forArgs, forProg):
+	def parseAt(self, forArgs, atInd, forProg):
 		self.value = True
-		return forArgs[1:]
+		return atInd + 1
 
 
 class ArgumentOptionEnumValue:
@@ -251,9 +573,9 @@ class ArgumentOptionEnum(ArgumentOptionNamed):
 		self.setValue = forValue.numRegistered
 		'''The value this should set the enum to.'''
 		forValue.numRegistered = forValue.numRegistered + 1
-	def parse(self, forArgs, forProg):
+	def parseAt(self, forArgs, atInd, forProg):
 		self.myClass.value = self.setValue
-		return forArgs[1:]
+		return atInd + 1
 	def value(self):
 		'''
 		Get whether this is the selected enum.
@@ -291,11 +613,11 @@ class ArgumentOptionInteger(ArgumentOptionNamed):
 		self.extTypeCode = ""
 		self.value = 0
 		'''The value of the integer.'''
-	def parse(self, forArgs, forProg):
-		if len(forArgs) < 2:
+	def parseAt(self, forArgs, atInd, forProg):
+		if (atInd + 1) >= len(forArgs):
 			raise IndexError("No value provided for " + self.name)
-		self.value = int(forArgs[1])
-		return forArgs[2:]
+		self.value = int(forArgs[atInd + 1])
+		return atInd + 2
 	def dumpInfo(self,toStr):
 		'''
 		Dump packed info on this thing.
@@ -324,11 +646,11 @@ class ArgumentOptionFloat(ArgumentOptionNamed):
 		self.extTypeCode = ""
 		self.value = 0.0
 		'''The value of the float.'''
-	def parse(self, forArgs, forProg):
-		if len(forArgs) < 2:
+	def parseAt(self, forArgs, atInd, forProg):
+		if (atInd + 1) >= len(forArgs):
 			raise IndexError("No value provided for " + self.name)
-		self.value = float(forArgs[1])
-		return forArgs[2:]
+		self.value = float(forArgs[atInd + 1])
+		return atInd + 2
 	def dumpInfo(self,toStr):
 		'''
 		Dump packed info on this thing.
@@ -357,11 +679,11 @@ class ArgumentOptionString(ArgumentOptionNamed):
 		self.extTypeCode = ""
 		self.value = ""
 		'''The value of the string.'''
-	def parse(self, forArgs, forProg):
-		if len(forArgs) < 2:
+	def parseAt(self, forArgs, atInd, forProg):
+		if (atInd + 1) >= len(forArgs):
 			raise IndexError("No value provided for " + self.name)
-		self.value = forArgs[1]
-		return forArgs[2:]
+		self.value = forArgs[atInd + 1]
+		return atInd + 2
 	def dumpInfo(self,toStr):
 		'''
 		Dump packed info on this thing.
@@ -392,11 +714,17 @@ class ArgumentOptionIntegerVector(ArgumentOptionNamed):
 		self.extTypeCode = ""
 		self.value = []
 		'''The value of the integer.'''
-	def parse(self, forArgs, forProg):
-		if len(forArgs) < 2:
+	def parseAt(self, forArgs, atInd, forProg):
+		if (atInd + 1) >= len(forArgs):
 			raise IndexError("No value provided for " + self.name)
-		self.value.append(int(forArgs[1]))
-		return forArgs[2:]
+		self.value.append(int(forArgs[atInd + 1]))
+		return atInd + 2
+	def useArrayStorage(self):
+		'''
+		Store the values in an array('q') instead of a list.
+		This takes 8 bytes per value, and the value can be passed to memoryview/numpy/struct without a copy.
+		'''
+		self.value = array.array("q", self.value)
 
 
 class ArgumentOptionFloatVector(ArgumentOptionNamed):
@@ -418,11 +746,17 @@ class ArgumentOptionFloatVector(ArgumentOptionNamed):
 		self.extTypeCode = ""
 		self.value = []
 		'''The value of the float.'''
-	def parse(self, forArgs, forProg):
-		if len(forArgs) < 2:
+	def parseAt(self, forArgs, atInd, forProg):
+		if (atInd + 1) >= len(forArgs):
 			raise IndexError("No value provided for " + self.name)
-		self.value.append(float(forArgs[1]))
-		return forArgs[2:]
+		self.value.append(float(forArgs[atInd + 1]))
+		return atInd + 2
+	def useArrayStorage(self):
+		'''
+		Store the values in an array('d') instead of a list.
+		This takes 8 bytes per value, and the value can be passed to memoryview/numpy/struct without a copy.
+		'''
+		self.value = array.array("d", self.value)
 
 
 class ArgumentOptionStringVector(ArgumentOptionNamed):
@@ -444,11 +778,45 @@ class ArgumentOptionStringVector(ArgumentOptionNamed):
 		self.extTypeCode = ""
 		self.value = []
 		'''The value of the string.'''
-	def parse(self, forArgs, forProg):
-		if len(forArgs) < 2:
+	def parseAt(self, forArgs, atInd, forProg):
+		if (atInd + 1) >= len(forArgs):
 			raise IndexError("No value provided for " + self.name)
-		self.value.append(forArgs[1])
-		return forArgs[2:]
+		self.value.append(forArgs[atInd + 1])
+		return atInd + 2
+	def useStringTable(self, prefixShare = False):
+		'''
+		Store the values in an ArgumentStringTable instead of a list.
+		This avoids a python object per value, and strings are only built when looked at.
+		@param prefixShare: Whether to store shared directory prefixes once.
+		'''
+		newV = ArgumentStringTable(prefixShare)
+		newV.extend(self.value)
+		self.value = newV
+
+
+def _numericRun(forArgs, startInd, convFun, toVals):
+	'''
+	Convert a run of numeric arguments, stopping at the first thing that is not a number.
+	Values are added a window at a time, so no list of the whole run is built.
+	@param forArgs: All the arguments.
+	@param startInd: The index of the first argument in the run.
+	@param convFun: The conversion to use.
+	@param toVals: The list or array to add the converted values to.
+	@return: The number of arguments converted.
+	'''
+	startLen = len(toVals)
+	curInd = startInd
+	winSize = 16
+	while curInd < len(forArgs):
+		winArgs = forArgs[curInd:(curInd + winSize)]
+		try:
+			toVals.extend(map(convFun, winArgs))
+		except ValueError:
+			# extend keeps everything converted before the failure
+			break
+		curInd = curInd + len(winArgs)
+		winSize = min(2*winSize, 65536)
+	return len(toVals) - startLen
 
 
 class ArgumentOptionIntegerGreedyVector(ArgumentOptionNamed):
@@ -470,14 +838,14 @@ class ArgumentOptionIntegerGreedyVector(ArgumentOptionNamed):
 		self.extTypeCode = ""
 		self.value = []
 		'''The value of the integer.'''
-	def parse(self, forArgs, forProg):
-		for i in range(1,len(forArgs)):
-			try:
-				addV = int(forArgs[i])
-				self.value.append(addV)
-			except ValueError as e:
-				return forArgs[i:]
-		return []
+	def parseAt(self, forArgs, atInd, forProg):
+		return atInd + 1 + _numericRun(forArgs, atInd + 1, int, self.value)
+	def useArrayStorage(self):
+		'''
+		Store the values in an array('q') instead of a list.
+		This takes 8 bytes per value, and the value can be passed to memoryview/numpy/struct without a copy.
+		'''
+		self.value = array.array("q", self.value)
 
 
 class ArgumentOptionFloatGreedyVector(ArgumentOptionNamed):
@@ -499,14 +867,14 @@ class ArgumentOptionFloatGreedyVector(ArgumentOptionNamed):
 		self.extTypeCode = ""
 		self.value = []
 		'''The value of the float.'''
-	def parse(self, forArgs, forProg):
-		for i in range(1,len(forArgs)):
-			try:
-				addV = float(forArgs[i])
-				self.value.append(addV)
-			except ValueError as e:
-				return forArgs[i:]
-		return []
+	def parseAt(self, forArgs, atInd, forProg):
+		return atInd + 1 + _numericRun(forArgs, atInd + 1, float, self.value)
+	def useArrayStorage(self):
+		'''
+		Store the values in an array('d') instead of a list.
+		This takes 8 bytes per value, and the value can be passed to memoryview/numpy/struct without a copy.
+		'''
+		self.value = array.array("d", self.value)
 
 
 class ArgumentOptionStringGreedyVector(ArgumentOptionNamed):
@@ -528,13 +896,22 @@ class ArgumentOptionStringGreedyVector(ArgumentOptionNamed):
 		self.extTypeCode = ""
 		self.value = []
 		'''The value of the string.'''
-	def parse(self, forArgs, forProg):
-		for i in range(1,len(forArgs)):
+	def parseAt(self, forArgs, atInd, forProg):
+		for i in range(atInd + 1,len(forArgs)):
 			curA = forArgs[i]
-			if (i>1) and (len(curA) >= 2) and (curA[0] == '-') and (curA[1] == '-'):
-				return forArgs[i:]
+			if (i > (atInd + 1)) and (len(curA) >= 2) and (curA[0] == '-') and (curA[1] == '-'):
+				return i
 			self.value.append(curA)
-		return []
+		return len(forArgs)
+	def useStringTable(self, prefixShare = False):
+		'''
+		Store the values in an ArgumentStringTable instead of a list.
+		This avoids a python object per value, and strings are only built when looked at.
+		@param prefixShare: Whether to store shared directory prefixes once.
+		'''
+		newV = ArgumentStringTable(prefixShare)
+		newV.extend(self.value)
+		self.value = newV
 
 
 class ArgumentOptionNull(ArgumentOption):
@@ -552,8 +929,100 @@ class ArgumentOptionNull(ArgumentOption):
 		self.extTypeCode = ""
 	def canParse(self, forArgs):
 		return (forArgs[0] == "--.-")
-	def parse(self, forArgs, forProg):
-		return forArgs[1:]
+	def parseAt(self, forArgs, atInd, forProg):
+		return atInd + 1
+
+
+_cpuCountEnvs = ("SLURM_CPUS_PER_TASK", "NSLOTS", "NCPUS", "PBS_NUM_PPN", "LSB_DJOB_NUMPROC")
+'''Environment variables batch schedulers use to say how many cpus a job has.'''
+
+def _readSmallFile(filePath):
+	'''
+	Read a small text file, like those under /proc and /sys.
+	@param filePath: The file to read.
+	@return: The stripped contents, or None if it could not be read.
+	'''
+	try:
+		with open(filePath, "r") as inF:
+			return inF.read().strip()
+	except (OSError, UnicodeDecodeError):
+		return None
+
+
+def cgroupCpuLimit(cgroupRoot = "/sys/fs/cgroup", procCgroup = "/proc/self/cgroup"):
+	'''
+	Get the cpu quota set on this process by cgroups (v1 or v2).
+	@param cgroupRoot: Where the cgroup file systems are mounted.
+	@param procCgroup: The file listing the cgroups of this process.
+	@return: The quota as a number of cpus, or None if there is none.
+	'''
+	allLimits = []
+	v2Path = "/"
+	v1Path = "/"
+	for line in (_readSmallFile(procCgroup) or "").splitlines():
+		lineParts = line.split(":", 2)
+		if len(lineParts) != 3:
+			continue
+		if (lineParts[0] == "0") and (lineParts[1] == ""):
+			v2Path = lineParts[2]
+		elif "cpu" in lineParts[1].split(","):
+			v1Path = lineParts[2]
+	# v2: any level from here up can have a limit
+	curPath = v2Path
+	while True:
+		for baseDir in (cgroupRoot, os.path.join(cgroupRoot, "unified")):
+			maxText = _readSmallFile(os.path.join(baseDir, curPath.lstrip("/"), "cpu.max"))
+			maxParts = [] if (maxText is None) else maxText.split()
+			if (len(maxParts) == 2) and (maxParts[0] != "max"):
+				try:
+					allLimits.append(int(maxParts[0]) / int(maxParts[1]))
+				except (ValueError, ZeroDivisionError):
+					pass
+		if len(curPath.strip("/")) == 0:
+			break
+		curPath = os.path.dirname(curPath.rstrip("/"))
+	# v1
+	for v1Dir in ("cpu", "cpu,cpuacct", "cpuacct,cpu"):
+		for subPath in set([v1Path.lstrip("/"), ""]):
+			quotaText = _readSmallFile(os.path.join(cgroupRoot, v1Dir, subPath, "cpu.cfs_quota_us"))
+			periodText = _readSmallFile(os.path.join(cgroupRoot, v1Dir, subPath, "cpu.cfs_period_us"))
+			try:
+				if (int(quotaText) > 0) and (int(periodText) > 0):
+					allLimits.append(int(quotaText) / int(periodText))
+			except (TypeError, ValueError):
+				pass
+	return min(allLimits) if (len(allLimits) > 0) else None
+
+
+def detectCpuCount(cgroupRoot = "/sys/fs/cgroup", procCgroup = "/proc/self/cgroup", environ = None, cpuSet = None):
+	'''
+	Figure out how many cpus this process should actually use.
+	This is the smallest of the cpus it can run on, its cgroup quota and any count from a batch scheduler.
+	@param cgroupRoot: Where the cgroup file systems are mounted.
+	@param procCgroup: The file listing the cgroups of this process.
+	@param environ: The environment variables to look at, or None for os.environ.
+	@param cpuSet: The cpus this can run on, or None to ask the OS.
+	@return: The number of cpus.
+	'''
+	if cpuSet is None:
+		try:
+			cpuSet = os.sched_getaffinity(0)
+		except AttributeError:
+			cpuSet = None
+	numCpu = len(cpuSet) if (cpuSet is not None) else (os.cpu_count() or 1)
+	cpuQuota = cgroupCpuLimit(cgroupRoot, procCgroup)
+	if cpuQuota is not None:
+		numCpu = min(numCpu, int(math.ceil(cpuQuota)))
+	if environ is None:
+		environ = os.environ
+	for envName in _cpuCountEnvs:
+		try:
+			envCount = int(environ.get(envName, ""))
+		except ValueError:
+			continue
+		if envCount > 0:
+			numCpu = min(numCpu, envCount)
+	return max(1, numCpu)
 
 
 class ArgumentOptionThreadcount(ArgumentOptionInteger):
@@ -562,8 +1031,17 @@ class ArgumentOptionThreadcount(ArgumentOptionInteger):
 		'''
 		Set up a threadcount.
 		'''
-		ArgumentOptionInteger.__init__(self,"--thread","Number of Threads","The number of threads to spin up.","--thread 1")
+		ArgumentOptionInteger.__init__(self,"--thread","Number of Threads","The number of threads to spin up, or auto to use the cpus available.","--thread 1")
 		self.value = 1
+		self.isAuto = False
+		'''Whether the count was picked from the cpus available.'''
+	def parseAt(self, forArgs, atInd, forProg):
+		if ((atInd + 1) < len(forArgs)) and (forArgs[atInd + 1] == "auto"):
+			self.isAuto = True
+			self.value = detectCpuCount()
+			return atInd + 2
+		self.isAuto = False
+		return ArgumentOptionInteger.parseAt(self, forArgs, atInd, forProg)
 	def idiotCheck(self):
 		if self.value <= 0:
 			raise ValueError("Need at least one thread.")
@@ -575,13 +1053,961 @@ class ArgumentOptionThreadgrain(ArgumentOptionInteger):
 		'''
 		Set up a threadcount.
 		'''
-		ArgumentOptionInteger.__init__(self,"--threadgrain","Thread Grain","The number of things each thread should do at a time.","--threadgrain 65536")
+		ArgumentOptionInteger.__init__(self,"--threadgrain","Thread Grain","The number of things each thread should do at a time, or auto to time the work and pick.","--threadgrain 65536")
 		self.value = 65536
+		self.isAuto = False
+		'''Whether to pick the grain by timing the work.'''
+		self.autoOverhead = 0.02
+		'''The largest fraction of time to spend on handing out chunks, when picking the grain.'''
+	def parseAt(self, forArgs, atInd, forProg):
+		if ((atInd + 1) < len(forArgs)) and (forArgs[atInd + 1] == "auto"):
+			self.isAuto = True
+			return atInd + 2
+		self.isAuto = False
+		return ArgumentOptionInteger.parseAt(self, forArgs, atInd, forProg)
 	def idiotCheck(self):
 		if self.value <= 0:
 			raise ValueError("Each thread needs to do at least one thing.")
 
 
+class ArgumentOptionPrefetch(ArgumentOptionInteger):
+	'''The number of input files to open and read ahead.'''
+	def __init__(self):
+		'''
+		Set up a prefetch depth.
+		'''
+		ArgumentOptionInteger.__init__(self,"--prefetch","Prefetch Depth","The number of input files to open and start reading ahead of the one being worked on.","--prefetch 2")
+		self.value = 2
+	def idiotCheck(self):
+		if self.value < 0:
+			raise ValueError("Cannot prefetch a negative number of files.")
+
+
+def _lookupPath(forPath):
+	'''
+	Look up a path on the file system.
+	@param forPath: The path to look up.
+	@return: The stat result (or None if it does not exist), whether it is readable, and whether it is writable.
+	'''
+	try:
+		pathStat = os.stat(forPath)
+	except OSError:
+		return (None, False, False)
+	return (pathStat, os.access(forPath, os.R_OK), os.access(forPath, os.W_OK))
+
+
+class ArgumentStatCache:
+	'''Looked up info on file system paths, so each path is only looked up once.'''
+	def __init__(self):
+		'''
+		Set up an empty cache.
+		'''
+		self.pathInfo = {}
+		'''The stat result (or None), readability and writability of each path.'''
+	def prefetch(self, forPaths, numThread = 16):
+		'''
+		Look up a bunch of paths at once.
+		@param forPaths: The paths to look up.
+		@param numThread: The maximum number of lookups to have going at once.
+		'''
+		import concurrent.futures
+		needPaths = list(set(path for path in forPaths if not (path in self.pathInfo)))
+		if len(needPaths) == 0:
+			return
+		if (numThread <= 1) or (len(needPaths) == 1):
+			allInfo = [_lookupPath(path) for path in needPaths]
+		else:
+			with concurrent.futures.ThreadPoolExecutor(max_workers = min(numThread, len(needPaths))) as lookPool:
+				allInfo = list(lookPool.map(_lookupPath, needPaths))
+		for path, info in zip(needPaths, allInfo):
+			self.pathInfo[path] = info
+	def lookup(self, forPath):
+		'''
+		Get the info on a path.
+		@param forPath: The path to look up.
+		@return: The stat result (or None if it does not exist), whether it is readable, and whether it is writable.
+		'''
+		curInfo = self.pathInfo.get(forPath)
+		if curInfo is None:
+			curInfo = _lookupPath(forPath)
+			self.pathInfo[forPath] = curInfo
+		return curInfo
+	def stat(self, forPath):
+		'''
+		Get the stat result for a path.
+		@param forPath: The path to look up.
+		@return: The stat result, or None if it does not exist.
+		'''
+		return self.lookup(forPath)[0]
+
+
+def _optionPaths(forOpt):
+	'''
+	Get the (non-empty) paths in a file or folder option.
+	@param forOpt: The option.
+	@return: The paths.
+	'''
+	if isinstance(forOpt.value, str):
+		return [forOpt.value] if (len(forOpt.value) > 0) else []
+	return [path for path in forOpt.value if len(path) > 0]
+
+
+def _optionCheckPaths(forOpt, forWrite):
+	'''
+	Get the paths a file or folder option needs looked up.
+	@param forOpt: The option.
+	@param forWrite: Whether the option is for writing: the containing folders are also needed.
+	@return: The paths.
+	'''
+	allPaths = _optionPaths(forOpt)
+	if forWrite:
+		allPaths = allPaths + [_parentFolder(path) for path in allPaths]
+	return allPaths
+
+
+def _parentFolder(forPath):
+	'''
+	Get the folder a path is in.
+	@param forPath: The path.
+	@return: The folder.
+	'''
+	parFold = os.path.dirname(os.path.normpath(forPath))
+	return parFold if (len(parFold) > 0) else "."
+
+
+def _checkOptionPaths(forOpt, statCache, forWrite, isFolder):
+	'''
+	Check the paths in a file or folder option.
+	@param forOpt: The option.
+	@param statCache: Looked up info on the paths.
+	@param forWrite: Whether the paths will be written to.
+	@param isFolder: Whether the paths are folders.
+	'''
+	kindName = "folder" if isFolder else "file"
+	validExts = getattr(forOpt, "validExts", None)
+	for path in _optionPaths(forOpt):
+		if (not isFolder) and validExts and not any((path.endswith(ext) or _stripCompression(path).endswith(ext)) for ext in validExts):
+			raise ValueError("Unexpected file extension for " + forOpt.name + ": " + path)
+		pathStat, canRead, canWrite = statCache.lookup(path)
+		if pathStat is None:
+			if not forWrite:
+				raise ValueError("Missing " + kindName + " for " + forOpt.name + ": " + path)
+			parStat, parRead, parWrite = statCache.lookup(_parentFolder(path))
+			if (parStat is None) or not stat.S_ISDIR(parStat.st_mode):
+				raise ValueError("Missing parent folder for " + forOpt.name + ": " + path)
+			if not parWrite:
+				raise ValueError("Cannot create " + kindName + " for " + forOpt.name + ": " + path)
+			continue
+		if stat.S_ISDIR(pathStat.st_mode) != isFolder:
+			raise ValueError("Expected a " + kindName + " for " + forOpt.name + ": " + path)
+		if not (canWrite if forWrite else canRead):
+			raise ValueError("Cannot " + ("write" if forWrite else "read") + " " + kindName + " for " + forOpt.name + ": " + path)
+
+
+_memoryUnits = {"": 1, "B": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40, "P": 1 << 50}
+'''The size of each memory unit, in bytes.'''
+
+def parseMemorySize(sizeText):
+	'''
+	Parse a memory size, like 8G, 512MiB or 1.5T (units are powers of 1024).
+	@param sizeText: The text to parse.
+	@return: The size in bytes.
+	'''
+	numText = sizeText.strip().upper()
+	for unitSuf in ("IB", "B"):
+		if (len(numText) > len(unitSuf)) and numText.endswith(unitSuf) and not numText[-len(unitSuf)-1].isdigit():
+			numText = numText[:-len(unitSuf)]
+			break
+	unitText = numText[-1:] if (numText[-1:].isalpha()) else ""
+	numText = numText[:len(numText) - len(unitText)].strip()
+	if not (unitText in _memoryUnits):
+		raise ValueError("Unknown memory unit: " + sizeText)
+	try:
+		numVal = float(numText) if ("." in numText) else int(numText)
+	except ValueError:
+		raise ValueError("Bad memory size: " + sizeText)
+	return int(numVal * _memoryUnits[unitText])
+
+
+def formatMemorySize(numBytes):
+	'''
+	Write out a memory size in the biggest unit that fits it exactly.
+	@param numBytes: The size in bytes.
+	@return: The size as text, like 8G.
+	'''
+	for unitText in ("P", "T", "G", "M", "K"):
+		unitSize = _memoryUnits[unitText]
+		if (numBytes != 0) and ((numBytes % unitSize) == 0):
+			return str(numBytes // unitSize) + unitText
+	return str(numBytes)
+
+
+def formatMemorySizeRounded(numBytes):
+	'''
+	Write out a memory size in the biggest unit it reaches, rounded to one place.
+	@param numBytes: The size in bytes.
+	@return: The size as text, like 1.3G.
+	'''
+	for unitText in ("P", "T", "G", "M", "K"):
+		unitSize = _memoryUnits[unitText]
+		if numBytes >= unitSize:
+			numText = "%.1f" % (numBytes / unitSize)
+			if numText.endswith(".0"):
+				numText = numText[:-2]
+			return numText + unitText
+	return str(numBytes)
+
+
+class ArgumentOptionMemory(ArgumentOptionInteger):
+	'''Set a memory size, like 8G: the value is in bytes.'''
+	def __init__(self,baseArg,repName,sumText,useText):
+		'''
+		Set up an option.
+		@param baseArg: The common sigil for this argument.
+		@param repName: The reporting name of this option.
+		@param sumText: A summary of this option.
+		@param useText: An example usage.
+		'''
+		ArgumentOptionInteger.__init__(self,baseArg,repName,sumText,useText)
+		self.extTypeCode = "memory"
+	def parseAt(self, forArgs, atInd, forProg):
+		if (atInd + 1) >= len(forArgs):
+			raise IndexError("No value provided for " + self.name)
+		self.value = parseMemorySize(forArgs[atInd + 1])
+		return atInd + 2
+	def idiotCheck(self):
+		if self.value < 0:
+			raise ValueError("Memory size for " + self.name + " cannot be negative.")
+
+
+class ArgumentOptionMemoryBudget(ArgumentOptionMemory):
+	'''
+	How much input mapRecords can have out with workers.
+	A chunk is counted by its size in bytes from when it is handed to a worker until its result is handed back, so this holds back reading when results are not being collected.
+	Results are not measured, and up to two more chunks per worker can sit read ahead.
+	Things given to mapChunked and parallelFor are already in memory, so they are not counted.
+	'''
+	def __init__(self):
+		'''
+		Set up a memory budget.
+		'''
+		ArgumentOptionMemory.__init__(self,"--memory","Memory Budget","The most bytes of input records to have out with workers or waiting to be handed back, like 8G. 0 for no limit.","--memory 8G")
+		self.value = 0
+
+
+class ArgumentMemoryGate:
+	'''Make producers wait while too much memory is tied up in work.'''
+	def __init__(self, maxBytes):
+		'''
+		Set up a gate.
+		@param maxBytes: The most memory to have in flight.
+		'''
+		self.maxBytes = maxBytes
+		'''The most memory to have in flight.'''
+		self.inFlight = 0
+		'''The memory currently in flight.'''
+		self.cond = threading.Condition()
+		'''Wait for room.'''
+	def acquire(self, numBytes):
+		'''
+		Wait until there is room for something, and claim it. Something too big on its own goes once nothing else is in flight.
+		@param numBytes: The size of the thing.
+		'''
+		with self.cond:
+			while (self.inFlight > 0) and ((self.inFlight + numBytes) > self.maxBytes):
+				self.cond.wait()
+			self.inFlight = self.inFlight + numBytes
+	def tryAcquire(self, numBytes):
+		'''
+		Claim room for something if there is room now.
+		@param numBytes: The size of the thing.
+		@return: Whether it was claimed.
+		'''
+		with self.cond:
+			if (self.inFlight > 0) and ((self.inFlight + numBytes) > self.maxBytes):
+				return False
+			self.inFlight = self.inFlight + numBytes
+			return True
+	def release(self, numBytes):
+		'''
+		Note that something is done.
+		@param numBytes: The size of the thing.
+		'''
+		with self.cond:
+			self.inFlight = self.inFlight - numBytes
+			self.cond.notify_all()
+
+
+class ArgumentOptionSchedule(ArgumentOptionString):
+	'''How to split up loops between threads.'''
+	def __init__(self):
+		'''
+		Set up a schedule option.
+		'''
+		ArgumentOptionString.__init__(self,"--schedule","Thread Schedule","How to split up work between threads: static, dynamic or guided.","--schedule dynamic")
+		self.value = "dynamic"
+	def idiotCheck(self):
+		if not (self.value in ArgumentLoopScheduler.schedules):
+			raise ValueError("Unknown schedule " + self.value + ": use static, dynamic or guided.")
+
+
+class ArgumentOptionAffinity(ArgumentOptionString):
+	'''Which cpus to pin workers to.'''
+	def __init__(self):
+		'''
+		Set up an affinity option.
+		'''
+		ArgumentOptionString.__init__(self,"--affinity","Thread Affinity","Pin workers to cpus: compact, scatter (across sockets) or a list like 0,2,4-7. Empty to not pin.","--affinity compact")
+	def idiotCheck(self):
+		if not (self.value in ("", "compact", "scatter")):
+			allCpu = parseCpuList(self.value)
+			if hasattr(os, "sched_getaffinity"):
+				badCpu = sorted(set(allCpu) - os.sched_getaffinity(0))
+				if len(badCpu) > 0:
+					raise ValueError("Cannot run on cpus " + ",".join(str(cpuI) for cpuI in badCpu) + " for " + self.name + ": available are " + ",".join(str(cpuI) for cpuI in sorted(os.sched_getaffinity(0))))
+
+
+def parseCpuList(listText):
+	'''
+	Parse a list of cpus, like 0,2,4-7.
+	@param listText: The list to parse.
+	@return: The cpus, in order.
+	'''
+	allCpu = []
+	for curPart in listText.split(","):
+		rangeParts = curPart.strip().split("-")
+		try:
+			if len(rangeParts) == 1:
+				allCpu.append(int(rangeParts[0]))
+			elif len(rangeParts) == 2:
+				allCpu.extend(range(int(rangeParts[0]), int(rangeParts[1]) + 1))
+			else:
+				raise ValueError()
+		except ValueError:
+			raise ValueError("Bad cpu list: " + listText)
+	if (len(allCpu) == 0) or (min(allCpu) < 0):
+		raise ValueError("Bad cpu list: " + listText)
+	return allCpu
+
+
+def _cpuPackage(cpuI):
+	'''
+	Get the socket a cpu is on.
+	@param cpuI: The cpu.
+	@return: The socket, or 0 if it is not known.
+	'''
+	packText = _readSmallFile("/sys/devices/system/cpu/cpu" + str(cpuI) + "/topology/physical_package_id")
+	try:
+		return int(packText)
+	except (TypeError, ValueError):
+		return 0
+
+
+def planAffinity(layout, numWorkers, cpuSet = None, cpuPackage = None):
+	'''
+	Figure out which cpu each worker should be pinned to.
+	@param layout: compact (fill cpus in order), scatter (spread over sockets) or a list of cpus like 0,2,4-7.
+	@param numWorkers: The number of workers.
+	@param cpuSet: The cpus available, or None to ask the OS.
+	@param cpuPackage: Get the socket of a cpu, or None to look in /sys.
+	@return: The set of cpus for each worker.
+	'''
+	if layout in ("compact", "scatter"):
+		if cpuSet is None:
+			try:
+				cpuSet = os.sched_getaffinity(0)
+			except AttributeError:
+				cpuSet = range(os.cpu_count() or 1)
+		useCpus = sorted(cpuSet)
+		if layout == "scatter":
+			if cpuPackage is None:
+				cpuPackage = _cpuPackage
+			packCpus = {}
+			for cpuI in useCpus:
+				packCpus.setdefault(cpuPackage(cpuI), []).append(cpuI)
+			packLists = [packCpus[pack] for pack in sorted(packCpus)]
+			useCpus = []
+			for i in range(max(len(packL) for packL in packLists)):
+				for packL in packLists:
+					if i < len(packL):
+						useCpus.append(packL[i])
+	else:
+		useCpus = parseCpuList(layout)
+	return [set([useCpus[i % len(useCpus)]]) for i in range(numWorkers)]
+
+
+def _pinThreadWorker(workerPlan, workerCount):
+	'''
+	Pin a pool thread to its cpus.
+	@param workerPlan: The cpus for each worker.
+	@param workerCount: Counts off workers as they start.
+	'''
+	if hasattr(os, "sched_setaffinity"):
+		os.sched_setaffinity(0, workerPlan[next(workerCount) % len(workerPlan)])
+
+
+def _initProcessWorker(workerPlan, workerCount, sharedHandles):
+	'''
+	Set up a pool process: pin it to its cpus and attach shared inputs.
+	@param workerPlan: The cpus for each worker, or None to not pin.
+	@param workerCount: A shared counter of workers that have started.
+	@param sharedHandles: The shared inputs to attach, from ArgumentSharedInputs.handles.
+	'''
+	if workerPlan is not None:
+		with workerCount.get_lock():
+			workerI = workerCount.value
+			workerCount.value = workerI + 1
+		if hasattr(os, "sched_setaffinity"):
+			os.sched_setaffinity(0, workerPlan[workerI % len(workerPlan)])
+	for inName in sharedHandles:
+		shmName, viewFormat, numBytes = sharedHandles[inName]
+		curShm = _SharedBlock(name = shmName)
+		_sharedBlocks[inName] = curShm
+		_sharedViews[inName] = _sharedView(curShm, numBytes, viewFormat)
+
+
+_sharedBlocks = {}
+'''The shared memory blocks this process has open, by input name.'''
+_sharedViews = {}
+'''Views of the shared inputs this process can see, by input name.'''
+
+def _sharedView(fromShm, numBytes, viewFormat):
+	'''
+	Make the read-only view handed out for a shared input.
+	@param fromShm: The shared memory block.
+	@param numBytes: The size of the input in bytes.
+	@param viewFormat: The memoryview format of the data.
+	@return: The view.
+	'''
+	with fromShm.buf[:numBytes] as byteView:
+		with byteView.cast(viewFormat) as castView:
+			return castView.toreadonly()
+
+
+_sharedBlockClass = None
+'''The shared memory class handed out by _SharedBlock, made on first use (multiprocessing is slow to import).'''
+
+def _SharedBlock(**shmArgs):
+	'''
+	Open or create shared memory that does not complain when collected while someone still has a view: the mapping goes with the last view.
+	@param shmArgs: The arguments for multiprocessing.shared_memory.SharedMemory.
+	@return: The block.
+	'''
+	global _sharedBlockClass
+	if _sharedBlockClass is None:
+		import multiprocessing.shared_memory
+		class SharedBlock(multiprocessing.shared_memory.SharedMemory):
+			def __del__(self):
+				try:
+					self.close()
+				except BufferError:
+					pass
+		_sharedBlockClass = SharedBlock
+	return _sharedBlockClass(**shmArgs)
+
+
+def sharedInput(inName):
+	'''
+	Get a shared input, from a worker process (or the program that shared it).
+	Every call gives the same view: it is released when the inputs are freed, so do not hold on to it (or things made from it) past run.
+	@param inName: The name it was shared under.
+	@return: A read-only memoryview of the data.
+	'''
+	return _sharedViews[inName]
+
+
+class ArgumentSharedInputs:
+	'''Read-only inputs copied once into shared memory, so process workers can view them without pickling.'''
+	def __init__(self):
+		'''
+		Set up an empty set of inputs.
+		'''
+		self.blocks = {}
+		'''The shared memory blocks, by input name.'''
+		self.handles = {}
+		'''What workers need to find each input: block name, memoryview format and size.'''
+		atexit.register(self.close)
+	def allocate(self, inName, numBytes, viewFormat):
+		'''
+		Make a block of shared memory for an input.
+		@param inName: The name of the input.
+		@param numBytes: The size of the input in bytes.
+		@param viewFormat: The memoryview format of the data.
+		@return: A writable view of the block, to fill.
+		'''
+		if inName in self.blocks:
+			raise ValueError("Already shared an input named " + inName)
+		curShm = _SharedBlock(create = True, size = max(1, numBytes))
+		self.blocks[inName] = curShm
+		self.handles[inName] = (curShm.name, viewFormat, numBytes)
+		_sharedBlocks[inName] = curShm
+		_sharedViews[inName] = _sharedView(curShm, numBytes, viewFormat)
+		return curShm.buf[:numBytes]
+	def publish(self, inName, inData):
+		'''
+		Share something that supports the buffer protocol (bytes, array, and the like).
+		@param inName: The name to share it under.
+		@param inData: The data to share.
+		'''
+		with memoryview(inData) as srcView:
+			with self.allocate(inName, srcView.nbytes, srcView.format) as dstView:
+				dstView[:] = srcView.cast("B")
+	def publishFile(self, inName, filePath):
+		'''
+		Share the contents of a file, reading it straight into shared memory.
+		@param inName: The name to share it under.
+		@param filePath: The file to read.
+		'''
+		with open(filePath, "rb") as inF:
+			numBytes = os.fstat(inF.fileno()).st_size
+			with self.allocate(inName, numBytes, "B") as dstView:
+				numRead = 0
+				while numRead < numBytes:
+					curRead = inF.readinto(dstView[numRead:])
+					if not curRead:
+						raise IOError("File changed size while sharing: " + filePath)
+					numRead = numRead + curRead
+	def close(self):
+		'''
+		Get rid of all the shared memory.
+		'''
+		for inName in self.blocks:
+			curView = _sharedViews.pop(inName, None)
+			if curView is not None:
+				try:
+					curView.release()
+				except BufferError:
+					# something was made from it: the memory goes when that does
+					pass
+			_sharedBlocks.pop(inName, None)
+			curShm = self.blocks[inName]
+			try:
+				curShm.unlink()
+			except FileNotFoundError:
+				pass
+			try:
+				curShm.close()
+			except BufferError:
+				# someone still has a view: the memory goes when they let go
+				pass
+		self.blocks.clear()
+		self.handles.clear()
+		atexit.unregister(self.close)
+
+
+class ArgumentLoopScheduler:
+	'''Hand out chunks of a loop to workers, OpenMP style.'''
+	schedules = ("static", "dynamic", "guided")
+	'''The known schedules.'''
+	def __init__(self, numItems, numWorkers, chunkSize, schedule):
+		'''
+		Set up a schedule.
+		@param numItems: The number of things in the loop.
+		@param numWorkers: The number of workers.
+		@param chunkSize: The number of things in a chunk (the smallest chunk for guided).
+		@param schedule: static (even split up front, then steal), dynamic (fixed chunks on demand) or guided (shrinking chunks on demand).
+		'''
+		if not (schedule in ArgumentLoopScheduler.schedules):
+			raise ValueError("Unknown schedule " + schedule)
+		self.numWorkers = numWorkers
+		'''The number of workers.'''
+		self.chunkSize = max(1, chunkSize)
+		'''The size of each chunk.'''
+		self.schedule = schedule
+		'''The schedule in use.'''
+		self.nextStart = 0
+		'''The start of the next chunk to hand out, for dynamic and guided.'''
+		self.numItems = numItems
+		'''The number of things in the loop.'''
+		self.stopped = False
+		'''Whether to stop handing out work.'''
+		self.lock = threading.Lock()
+		'''Protect the schedule.'''
+		self.workQueues = []
+		'''The chunks each worker has yet to do, for static.'''
+		if schedule == "static":
+			for wi in range(numWorkers):
+				rangeS = (wi * numItems) // numWorkers
+				rangeE = ((wi + 1) * numItems) // numWorkers
+				self.workQueues.append(collections.deque((i, min(i + self.chunkSize, rangeE)) for i in range(rangeS, rangeE, self.chunkSize)))
+	def nextChunk(self, workerI):
+		'''
+		Get the next chunk for a worker to do.
+		@param workerI: The index of the worker.
+		@return: The start and end of the chunk, or None if there is nothing left.
+		'''
+		with self.lock:
+			if self.stopped:
+				return None
+			if self.schedule == "static":
+				myQueue = self.workQueues[workerI]
+				if len(myQueue) > 0:
+					return myQueue.popleft()
+				# steal from the back of whoever has the most left
+				victQueue = max(self.workQueues, key = len)
+				if len(victQueue) == 0:
+					return None
+				return victQueue.pop()
+			if self.nextStart >= self.numItems:
+				return None
+			curSize = self.chunkSize
+			if self.schedule == "guided":
+				curSize = max(curSize, (self.numItems - self.nextStart) // self.numWorkers)
+			retChunk = (self.nextStart, min(self.numItems, self.nextStart + curSize))
+			self.nextStart = retChunk[1]
+			return retChunk
+	def stop(self):
+		'''
+		Stop handing out work.
+		'''
+		with self.lock:
+			self.stopped = True
+
+
+def _streamDescriptor(toStr):
+	'''
+	Get the file descriptor behind a stream, if it can be written with writev.
+	@param toStr: The stream.
+	@return: The descriptor, or None.
+	'''
+	if not hasattr(os, "writev"):
+		return None
+	try:
+		return toStr.fileno()
+	except (AttributeError, OSError, ValueError):
+		return None
+
+
+def _writeAll(toFD, allBufs):
+	'''
+	Write a bunch of buffers to a file descriptor, with as few calls as possible.
+	@param toFD: The descriptor to write to.
+	@param allBufs: The buffers to write.
+	'''
+	try:
+		maxVec = os.sysconf("SC_IOV_MAX")
+	except (AttributeError, OSError, ValueError):
+		maxVec = 1024
+	allBufs = collections.deque(memoryview(buf) for buf in allBufs if len(buf) > 0)
+	while len(allBufs) > 0:
+		numWrote = os.writev(toFD, list(itertools.islice(allBufs, 0, maxVec)))
+		while numWrote > 0:
+			headLen = len(allBufs[0])
+			if numWrote >= headLen:
+				allBufs.popleft()
+				numWrote = numWrote - headLen
+			else:
+				allBufs[0] = allBufs[0][numWrote:]
+				numWrote = 0
+
+
+class ArgumentOutputWriter:
+	'''Collect results from workers and write them out in big pieces, in order or as they come.'''
+	def __init__(self, toStr, ordered = True, maxPending = 64, flushBytes = 1048576):
+		'''
+		Set up a writer.
+		@param toStr: The binary stream to write to.
+		@param ordered: Whether to write results in sequence order: otherwise they are written as they arrive.
+		@param maxPending: The most results to hold waiting for an earlier one: anyone further ahead waits.
+		@param flushBytes: The number of bytes to collect before writing.
+		'''
+		self.toStr = toStr
+		'''The stream to write to.'''
+		self.toFD = _streamDescriptor(toStr)
+		'''The descriptor to writev to, if any.'''
+		self.ordered = ordered
+		'''Whether to write results in order.'''
+		self.maxPending = max(1, maxPending)
+		'''The most results to hold out of order.'''
+		self.flushBytes = flushBytes
+		'''The number of bytes to collect before writing.'''
+		self.nextSeq = 0
+		'''The next result to write, when ordered.'''
+		self.waiting = {}
+		'''Results that arrived before their turn, by sequence number.'''
+		self.ready = []
+		'''Results ready to write.'''
+		self.readyBytes = 0
+		'''The number of bytes ready to write.'''
+		self.cond = threading.Condition()
+		'''Protect the buffers, and wait for room.'''
+		self.writing = False
+		'''Whether some thread is writing out: the write happens outside the lock, and only one thread writes at a time.'''
+		self.stopped = False
+		'''Whether the writer was abandoned because of an error.'''
+	def put(self, seqNum, resData):
+		'''
+		Hand over a result.
+		@param seqNum: The position of the result (counting from zero): ignored if unordered.
+		@param resData: The bytes to write.
+		'''
+		with self.cond:
+			if not self.ordered:
+				self._addReady(resData)
+			else:
+				if seqNum < self.nextSeq or (seqNum in self.waiting):
+					raise ValueError("Result " + str(seqNum) + " handed over twice.")
+				while seqNum >= (self.nextSeq + self.maxPending):
+					if self.stopped:
+						raise ValueError("Output abandoned while waiting for result " + str(self.nextSeq) + ".")
+					self.cond.wait()
+				self.waiting[seqNum] = resData
+				while self.nextSeq in self.waiting:
+					self._addReady(self.waiting.pop(self.nextSeq))
+					self.nextSeq = self.nextSeq + 1
+				self.cond.notify_all()
+			# do not let too much pile up behind a slow write
+			while self.writing and (self.readyBytes >= (4 * self.flushBytes)) and not self.stopped:
+				self.cond.wait()
+			if self.writing or (self.readyBytes < self.flushBytes):
+				return
+			self.writing = True
+		self._writeReady(False)
+	def _addReady(self, resData):
+		'''
+		Queue something for writing: call with the lock held.
+		@param resData: The bytes to write.
+		'''
+		self.ready.append(resData)
+		self.readyBytes = self.readyBytes + len(resData)
+	def _writeReady(self, writeAll):
+		'''
+		Write out what is ready, a batch at a time, with the lock released while writing: call after claiming the writing flag.
+		@param writeAll: Whether to write everything (and flush the stream), instead of stopping once less than flushBytes is ready.
+		'''
+		try:
+			while True:
+				with self.cond:
+					if (len(self.ready) == 0) or ((self.readyBytes < self.flushBytes) and not writeAll):
+						break
+					allBufs = self.ready
+					self.ready = []
+					self.readyBytes = 0
+					self.cond.notify_all()
+				if self.toFD is None:
+					self.toStr.write(b"".join(allBufs))
+				else:
+					self.toStr.flush()
+					_writeAll(self.toFD, allBufs)
+			if writeAll and (self.toFD is None):
+				self.toStr.flush()
+		finally:
+			with self.cond:
+				self.writing = False
+				self.cond.notify_all()
+	def flush(self):
+		'''
+		Write out everything that can be written.
+		'''
+		with self.cond:
+			while self.writing:
+				self.cond.wait()
+			self.writing = True
+		self._writeReady(True)
+	def close(self):
+		'''
+		Write out everything: complains if any results are missing.
+		'''
+		self.flush()
+		if len(self.waiting) > 0:
+			raise ValueError("Missing result " + str(self.nextSeq) + " before " + str(len(self.waiting)) + " others.")
+	def abandon(self):
+		'''
+		Give up because of an error: anyone waiting for room will fail.
+		'''
+		with self.cond:
+			self.stopped = True
+			self.cond.notify_all()
+	def __enter__(self):
+		return self
+	def __exit__(self, excType, excValue, excTrace):
+		if excType is None:
+			self.close()
+		else:
+			self.abandon()
+			self.flush()
+
+
+class ArgumentAsyncReader:
+	'''Read a binary stream from asyncio code, like an asyncio.StreamReader: blocks are read on a helper thread as needed.'''
+	def __init__(self, fromStr, blockSize = 65536):
+		'''
+		Set up a reader.
+		@param fromStr: The binary stream to read.
+		@param blockSize: The most bytes to read at a time.
+		'''
+		import concurrent.futures
+		self.fromStr = fromStr
+		'''The stream to read.'''
+		self.readFun = fromStr.read1 if hasattr(fromStr, "read1") else fromStr.read
+		'''Read whatever is available, up to a size.'''
+		self.blockSize = blockSize
+		'''The most bytes to read at a time.'''
+		self.buffer = bytearray()
+		'''Data read but not yet handed out.'''
+		self.eof = False
+		'''Whether the stream has run out.'''
+		self.ioPool = concurrent.futures.ThreadPoolExecutor(max_workers = 1)
+		'''The thread to read on.'''
+	async def _fill(self):
+		'''
+		Read another block into the buffer.
+		'''
+		import asyncio
+		curB = await asyncio.get_running_loop().run_in_executor(self.ioPool, self.readFun, self.blockSize)
+		if curB:
+			self.buffer.extend(curB)
+		else:
+			self.eof = True
+	def _take(self, numBytes):
+		'''
+		Take bytes off the front of the buffer.
+		@param numBytes: The number of bytes to take.
+		@return: The bytes.
+		'''
+		retB = bytes(self.buffer[:numBytes])
+		del self.buffer[:numBytes]
+		return retB
+	async def read(self, n = -1):
+		'''
+		Read some bytes.
+		@param n: The most to read, or -1 to read everything.
+		@return: The bytes: empty at the end.
+		'''
+		if n < 0:
+			while not self.eof:
+				await self._fill()
+			return self._take(len(self.buffer))
+		if (len(self.buffer) == 0) and not self.eof:
+			await self._fill()
+		return self._take(n)
+	async def readexactly(self, n):
+		'''
+		Read an exact number of bytes.
+		@param n: The number to read.
+		@return: The bytes.
+		'''
+		import asyncio
+		while (len(self.buffer) < n) and not self.eof:
+			await self._fill()
+		if len(self.buffer) < n:
+			raise asyncio.IncompleteReadError(self._take(len(self.buffer)), n)
+		return self._take(n)
+	async def readuntil(self, separator = b"\n"):
+		'''
+		Read up to and including a separator.
+		@param separator: The separator to look for.
+		@return: The bytes.
+		'''
+		import asyncio
+		lookFrom = 0
+		while True:
+			sepI = self.buffer.find(separator, lookFrom)
+			if sepI >= 0:
+				return self._take(sepI + len(separator))
+			if self.eof:
+				raise asyncio.IncompleteReadError(self._take(len(self.buffer)), None)
+			lookFrom = max(0, len(self.buffer) - len(separator) + 1)
+			await self._fill()
+	async def readline(self):
+		'''
+		Read a line.
+		@return: The line, including its newline (unless it is the last): empty at the end.
+		'''
+		import asyncio
+		try:
+			return await self.readuntil(b"\n")
+		except asyncio.IncompleteReadError as readErr:
+			return readErr.partial
+	def at_eof(self):
+		'''
+		Get whether everything has been read.
+		@return: Whether the stream is done and the buffer is empty.
+		'''
+		return self.eof and (len(self.buffer) == 0)
+	def __aiter__(self):
+		return self
+	async def __anext__(self):
+		curLine = await self.readline()
+		if len(curLine) == 0:
+			raise StopAsyncIteration
+		return curLine
+	def close(self):
+		'''
+		Stop the reading thread.
+		'''
+		self.ioPool.shutdown(wait = False)
+
+
+class ArgumentAsyncWriter:
+	'''Write a binary stream from asyncio code, like an asyncio.StreamWriter: writes happen on a helper thread, in big pieces.'''
+	def __init__(self, toStr, flushBytes = 1048576):
+		'''
+		Set up a writer.
+		@param toStr: The binary stream to write.
+		@param flushBytes: The number of bytes to collect before drain writes them out.
+		'''
+		import concurrent.futures
+		self.toStr = toStr
+		'''The stream to write.'''
+		self.outWriter = ArgumentOutputWriter(toStr, False, 1, flushBytes)
+		'''Coalesces the writes.'''
+		self.flushBytes = flushBytes
+		'''The number of bytes to collect before writing.'''
+		self.pending = []
+		'''Data waiting to be written.'''
+		self.pendingBytes = 0
+		'''The number of bytes waiting.'''
+		self.ioPool = concurrent.futures.ThreadPoolExecutor(max_workers = 1)
+		'''The thread to write on.'''
+	def write(self, data):
+		'''
+		Queue some data: call drain to let it out.
+		@param data: The bytes to write.
+		'''
+		self.pending.append(bytes(data))
+		self.pendingBytes = self.pendingBytes + len(data)
+	def _writePending(self, allBufs, andFlush):
+		'''
+		Write some data, on the helper thread.
+		@param allBufs: The data to write.
+		@param andFlush: Whether to flush the stream afterwards.
+		'''
+		for curB in allBufs:
+			self.outWriter.put(0, curB)
+		if andFlush:
+			self.outWriter.flush()
+	async def _flushPending(self, andFlush):
+		'''
+		Write out everything queued.
+		@param andFlush: Whether to flush the stream afterwards.
+		'''
+		import asyncio
+		allBufs = self.pending
+		self.pending = []
+		self.pendingBytes = 0
+		await asyncio.get_running_loop().run_in_executor(self.ioPool, self._writePending, allBufs, andFlush)
+	async def drain(self):
+		'''
+		Wait for queued data to be written, if there is a lot of it.
+		'''
+		if self.pendingBytes >= self.flushBytes:
+			await self._flushPending(False)
+	async def flush(self):
+		'''
+		Write out and flush everything.
+		'''
+		await self._flushPending(True)
+	async def close(self):
+		'''
+		Write out everything and stop the writing thread.
+		'''
+		try:
+			await self.flush()
+		finally:
+			self.ioPool.shutdown(wait = True)
+
+
 def _dumpFileIOItems(dumpFor, toStr, hasCur):
 	# prepare to dump
 	extDs = []
@@ -607,6 +2033,500 @@ def _dumpFileIOItems(dumpFor, toStr, hasCur):
 		toStr.write(curED)
 
 
+_compressionKinds = {".gz": "gzip", ".bgz": "bgzf", ".bz2": "bz2", ".xz": "lzma", ".lzma": "lzma"}
+'''The kind of compression for each file extension.'''
+
+def compressionKind(forPath):
+	'''
+	Figure out how a file is compressed from its extension.
+	@param forPath: The path to the file.
+	@return: gzip, bgzf (blocked gzip, as used by htslib), bz2, lzma or None.
+	'''
+	for compExt in _compressionKinds:
+		if forPath.endswith(compExt):
+			return _compressionKinds[compExt]
+	return None
+
+
+def _stripCompression(forPath):
+	'''
+	Remove any compression extension from a path.
+	@param forPath: The path.
+	@return: The path without it.
+	'''
+	for compExt in _compressionKinds:
+		if forPath.endswith(compExt):
+			return forPath[:-len(compExt)]
+	return forPath
+
+
+_bgzfBlockSize = 65280
+'''The most data to put in one BGZF block (so the compressed block fits in 64 KiB).'''
+_bgzfEOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+'''The empty block that ends a BGZF file.'''
+
+def _compressBGZF(compLevel, blockData):
+	'''
+	Compress data as a run of BGZF blocks: gzip members with the BC extra field giving the block size.
+	@param compLevel: The compression level.
+	@param blockData: The data to compress.
+	@return: The compressed blocks.
+	'''
+	allBlocks = []
+	for i in range(0, len(blockData), _bgzfBlockSize):
+		curData = blockData[i:(i + _bgzfBlockSize)]
+		curComp = zlib.compressobj(compLevel, zlib.DEFLATED, -15)
+		compData = curComp.compress(curData) + curComp.flush()
+		allBlocks.append(b"\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00" + struct.pack("<H", len(compData) + 25))
+		allBlocks.append(compData)
+		allBlocks.append(struct.pack("<II", zlib.crc32(curData), len(curData)))
+	return b"".join(allBlocks)
+
+
+def _compressBlock(compKind, compLevel, blockData):
+	'''
+	Compress a block as a stand-alone member, in a worker.
+	@param compKind: gzip, bgzf, bz2 or lzma.
+	@param compLevel: The compression level.
+	@param blockData: The data to compress.
+	@return: The compressed data.
+	'''
+	import bz2
+	import gzip
+	import lzma
+	if compKind == "bgzf":
+		return _compressBGZF(compLevel, blockData)
+	if compKind == "gzip":
+		return gzip.compress(blockData, compLevel, mtime = 0)
+	if compKind == "bz2":
+		return bz2.compress(blockData, compLevel)
+	return lzma.compress(blockData, preset = compLevel)
+
+
+class ArgumentReadAheadStream(io.RawIOBase):
+	'''Read a stream in big blocks on a background thread (for decompressing while the program works).'''
+	def __init__(self, fromStr, blockSize = 1048576, numAhead = 4):
+		'''
+		Start reading.
+		@param fromStr: The stream to read from: closed when this is.
+		@param blockSize: The number of bytes in each block.
+		@param numAhead: The most blocks to read ahead.
+		'''
+		io.RawIOBase.__init__(self)
+		self.fromStr = fromStr
+		'''The stream to read from.'''
+		self.readQueue = queue.Queue(max(1, numAhead))
+		'''Blocks read ahead, as (data, error) pairs.'''
+		self.stopFlag = threading.Event()
+		'''Set to stop the reading thread.'''
+		self.curBlock = memoryview(b"")
+		'''The rest of the block being handed out.'''
+		self.atEnd = False
+		'''Whether the end has been seen.'''
+		self.readThread = threading.Thread(target = self._readBlocks, args = (blockSize,), daemon = True)
+		'''The thread doing the reading.'''
+		self.readThread.start()
+	def _readBlocks(self, blockSize):
+		'''
+		Read blocks into the queue, on the background thread.
+		@param blockSize: The number of bytes in each block.
+		'''
+		def putItem(curItem):
+			while not self.stopFlag.is_set():
+				try:
+					self.readQueue.put(curItem, timeout = 0.1)
+					return True
+				except queue.Full:
+					pass
+			return False
+		try:
+			while True:
+				curB = self.fromStr.read(blockSize)
+				if not putItem((curB, None)) or not curB:
+					return
+		except BaseException as readErr:
+			putItem((b"", readErr))
+	def readable(self):
+		return True
+	def readinto(self, toBuf):
+		while (len(self.curBlock) == 0) and not self.atEnd:
+			curB, readErr = self.readQueue.get()
+			if readErr is not None:
+				self.atEnd = True
+				raise readErr
+			if not curB:
+				self.atEnd = True
+			self.curBlock = memoryview(curB)
+		numCopy = min(len(toBuf), len(self.curBlock))
+		toBuf[0:numCopy] = self.curBlock[0:numCopy]
+		self.curBlock = self.curBlock[numCopy:]
+		return numCopy
+	def close(self):
+		if not self.closed:
+			self.stopFlag.set()
+			self.readThread.join()
+			self.fromStr.close()
+		io.RawIOBase.close(self)
+
+
+class ArgumentBlockCompressStream(io.BufferedIOBase):
+	'''Compress a stream in blocks on a pool of threads, writing each block as its own member (so any reader can handle it).'''
+	def __init__(self, toStr, compKind, blockSize = 1048576, numThreads = 1, compLevel = None):
+		'''
+		Set up a compressor.
+		@param toStr: The binary stream to write compressed data to: closed when this is.
+		@param compKind: gzip, bgzf, bz2 or lzma.
+		@param blockSize: The number of bytes in each block.
+		@param numThreads: The number of threads to compress on.
+		@param compLevel: The compression level, or None for a reasonable default.
+		'''
+		import concurrent.futures
+		io.BufferedIOBase.__init__(self)
+		self.toStr = toStr
+		'''The stream to write to.'''
+		self.compKind = compKind
+		'''The kind of compression.'''
+		self.compLevel = compLevel if (compLevel is not None) else {"gzip": 6, "bgzf": 6, "bz2": 9, "lzma": 6}[compKind]
+		'''The compression level.'''
+		self.blockSize = blockSize
+		'''The number of bytes in each block.'''
+		self.numThreads = max(1, numThreads)
+		'''The number of threads to compress on.'''
+		self.curBlock = bytearray()
+		'''The block being filled.'''
+		self.compPool = None if (self.numThreads == 1) else concurrent.futures.ThreadPoolExecutor(max_workers = self.numThreads)
+		'''The threads to compress on.'''
+		self.allFut = collections.deque()
+		'''Blocks being compressed, in order.'''
+	def writable(self):
+		return True
+	def write(self, data):
+		if self.closed:
+			raise ValueError("Write to closed file.")
+		self.curBlock.extend(data)
+		while len(self.curBlock) >= self.blockSize:
+			self._sendBlock(bytes(self.curBlock[:self.blockSize]))
+			del self.curBlock[:self.blockSize]
+		return len(data)
+	def _sendBlock(self, blockData):
+		'''
+		Compress a block, writing out finished blocks if too many are waiting.
+		@param blockData: The block.
+		'''
+		if self.compPool is None:
+			self.toStr.write(_compressBlock(self.compKind, self.compLevel, blockData))
+			return
+		self.allFut.append(self.compPool.submit(_compressBlock, self.compKind, self.compLevel, blockData))
+		while len(self.allFut) > (2 * self.numThreads):
+			self.toStr.write(self.allFut.popleft().result())
+	def flush(self):
+		if self.closed or self.toStr.closed:
+			return
+		if len(self.curBlock) > 0:
+			self._sendBlock(bytes(self.curBlock))
+			self.curBlock = bytearray()
+		while len(self.allFut) > 0:
+			self.toStr.write(self.allFut.popleft().result())
+		self.toStr.flush()
+	def close(self):
+		if self.closed:
+			return
+		try:
+			self.flush()
+			if self.compKind == "bgzf":
+				self.toStr.write(_bgzfEOF)
+				self.toStr.flush()
+		finally:
+			if self.compPool is not None:
+				self.compPool.shutdown(wait = True, cancel_futures = True)
+			self.toStr.close()
+			io.BufferedIOBase.close(self)
+
+
+def openFile(filePath, mode = "rb", blockSize = 1048576, numAhead = 4, numThreads = None, compLevel = None):
+	'''
+	Open a file, compressing or decompressing by its extension (.gz, .bgz, .bz2, .xz, .lzma).
+	Compressed reads decompress on a background thread; compressed writes compress blocks on a pool of threads.
+	@param filePath: The file to open.
+	@param mode: r, w or a, with b (the default) or t (utf-8).
+	@param blockSize: The size of the buffers and compressed blocks.
+	@param numAhead: The most blocks to decompress ahead of the reader.
+	@param numThreads: The number of threads to compress on, or None to use the available cpus.
+	@param compLevel: The compression level, or None for the default.
+	@return: The opened stream.
+	'''
+	import bz2
+	import gzip
+	import lzma
+	binMode = mode.replace("t", "").replace("b", "") + "b"
+	if not (binMode in ("rb", "wb", "ab")):
+		raise ValueError("Unsupported file mode " + mode)
+	compKind = compressionKind(filePath)
+	if compKind is None:
+		binStr = open(filePath, binMode, buffering = blockSize)
+	elif binMode == "rb":
+		if compKind in ("gzip", "bgzf"):
+			compStr = gzip.GzipFile(filePath, "rb")
+		elif compKind == "bz2":
+			compStr = bz2.BZ2File(filePath, "rb")
+		else:
+			compStr = lzma.LZMAFile(filePath, "rb")
+		binStr = io.BufferedReader(ArgumentReadAheadStream(compStr, blockSize, numAhead), blockSize)
+	else:
+		useThreads = detectCpuCount() if (numThreads is None) else numThreads
+		binStr = ArgumentBlockCompressStream(open(filePath, binMode), compKind, blockSize, useThreads, compLevel)
+	if "t" in mode:
+		return io.TextIOWrapper(binStr, encoding = "utf-8")
+	return binStr
+
+
+_mapAdvice = {"normal": "MADV_NORMAL", "sequential": "MADV_SEQUENTIAL", "random": "MADV_RANDOM", "willneed": "MADV_WILLNEED"}
+'''The madvise flag for each kind of access.'''
+
+def mapFile(filePath, advice = "sequential", blockSize = 1048576):
+	'''
+	Get the contents of a file without copying it, by mapping it into memory.
+	Things that cannot be mapped (pipes, terminals, empty files) are read in instead.
+	@param filePath: The file to map.
+	@param advice: How the data will be used (normal, sequential, random or willneed), or None to not say.
+	@param blockSize: The number of bytes to read at a time, if it must be read.
+	@return: A read-only memoryview of the contents.
+	'''
+	import mmap
+	if (advice is not None) and not (advice in _mapAdvice):
+		raise ValueError("Unknown access pattern " + advice)
+	with open(filePath, "rb", buffering = 0) as inF:
+		fileStat = os.fstat(inF.fileno())
+		if stat.S_ISREG(fileStat.st_mode) and (fileStat.st_size > 0):
+			fileMap = mmap.mmap(inF.fileno(), 0, access = mmap.ACCESS_READ)
+			madvFlag = getattr(mmap, _mapAdvice[advice], None) if (advice is not None) else None
+			if (madvFlag is not None) and hasattr(fileMap, "madvise"):
+				fileMap.madvise(madvFlag)
+			return memoryview(fileMap)
+		allData = bytearray()
+		while True:
+			curB = inF.read(blockSize)
+			if not curB:
+				break
+			allData.extend(curB)
+		return memoryview(allData).toreadonly()
+
+
+def _prefetchFile(filePath, blockSize):
+	'''
+	Open a file and fill its first buffer, on a prefetch thread.
+	@param filePath: The file to open.
+	@param blockSize: The size of the buffer.
+	@return: The opened file.
+	'''
+	inF = openFile(filePath, "rb", blockSize)
+	try:
+		if (compressionKind(filePath) is None) and hasattr(os, "posix_fadvise"):
+			try:
+				os.posix_fadvise(inF.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+			except OSError:
+				pass
+		inF.peek(1)
+	except BaseException:
+		inF.close()
+		raise
+	return inF
+
+
+class ArgumentFilePrefetcher:
+	'''
+	Open files ahead of time on background threads, and hand them out in order.
+	Up to depth files are open besides the one being worked on, and each holds what openFile holds.
+	A plain file holds one buffer of blockSize.
+	A compressed file holds numAhead plus three blocks of decompressed data: its buffer, the read-ahead queue (4 blocks, so 4 MiB by default), the block waiting to go in and the block being handed out.
+	It also holds the decompressor's state: a 32 KiB window for gzip, up to about 4 MiB for bz2, and the dictionary for xz/lzma (8 MiB at the default preset, 64 MiB at the highest).
+	So with the defaults, memory is bounded by roughly (depth + 1) times 7 MiB plus the dictionaries, not depth times blockSize.
+	'''
+	def __init__(self, filePaths, depth = 2, blockSize = 1048576):
+		'''
+		Start prefetching.
+		@param filePaths: The files to open, in order.
+		@param depth: The most files to have open ahead of the one being worked on.
+		@param blockSize: The size of the buffers for each file (and the blocks read ahead in compressed files).
+		'''
+		import concurrent.futures
+		self.filePaths = list(filePaths)
+		'''The files to open.'''
+		self.depth = depth
+		'''The most files to open ahead.'''
+		self.blockSize = blockSize
+		'''The size of the buffers for each file.'''
+		self.nextI = 0
+		'''The index of the next file to start opening.'''
+		self.allFut = collections.deque()
+		'''The files being opened, in order.'''
+		self.curFile = None
+		'''The file last handed out.'''
+		self.ioPool = None if (depth <= 0) else concurrent.futures.ThreadPoolExecutor(max_workers = depth)
+		'''The threads to open files on.'''
+		self._fillAhead()
+	def _fillAhead(self):
+		'''
+		Start opening files until there are enough on the way.
+		'''
+		if self.ioPool is None:
+			return
+		while (self.nextI < len(self.filePaths)) and (len(self.allFut) < self.depth):
+			self.allFut.append(self.ioPool.submit(_prefetchFile, self.filePaths[self.nextI], self.blockSize))
+			self.nextI = self.nextI + 1
+	def __iter__(self):
+		return self
+	def __next__(self):
+		if self.curFile is not None:
+			self.curFile.close()
+			self.curFile = None
+		if len(self.allFut) > 0:
+			curFut = self.allFut.popleft()
+			self._fillAhead()
+			self.curFile = curFut.result()
+		elif self.nextI < len(self.filePaths):
+			self.curFile = openFile(self.filePaths[self.nextI], "rb", self.blockSize)
+			self.nextI = self.nextI + 1
+		else:
+			raise StopIteration
+		return self.curFile
+	def close(self):
+		'''
+		Close the last file handed out and anything opened ahead.
+		'''
+		if self.curFile is not None:
+			self.curFile.close()
+			self.curFile = None
+		self.nextI = len(self.filePaths)
+		for curFut in self.allFut:
+			if curFut.cancel():
+				continue
+			try:
+				curFut.result().close()
+			except Exception:
+				pass
+		self.allFut.clear()
+		if self.ioPool is not None:
+			self.ioPool.shutdown(wait = True)
+	def __enter__(self):
+		return self
+	def __exit__(self, excType, excValue, excTrace):
+		self.close()
+
+
+class ArgumentFileWorkPlan:
+	'''Split files between workers by size, biggest first (longest processing time first).'''
+	def __init__(self, filePaths, numWorkers, statCache = None, byDevice = False, secondsPerByte = None):
+		'''
+		Make a plan.
+		@param filePaths: The files to split up.
+		@param numWorkers: The number of workers.
+		@param statCache: Looked up info on the files, or None to look them up here.
+		@param byDevice: Whether each worker should go through its files in device and inode order (kinder to spinning disks).
+		@param secondsPerByte: How long a byte of file takes to work on (from an earlier run or a calibration sample), or None if not known.
+		'''
+		if statCache is None:
+			statCache = ArgumentStatCache()
+			statCache.prefetch(filePaths)
+		self.filePaths = list(filePaths)
+		'''The files to work on.'''
+		self.fileSizes = []
+		'''The size of each file (zero if it could not be looked up).'''
+		fileKeys = []
+		for path in self.filePaths:
+			pathStat = statCache.stat(path)
+			hasSize = (pathStat is not None) and stat.S_ISREG(pathStat.st_mode)
+			self.fileSizes.append(pathStat.st_size if hasSize else 0)
+			fileKeys.append((pathStat.st_dev, pathStat.st_ino) if (pathStat is not None) else (-1, -1))
+		numWorkers = max(1, min(numWorkers, len(self.filePaths)))
+		self.workerFiles = [[] for i in range(numWorkers)]
+		'''The indices of the files each worker does, in the order it does them.'''
+		self.workerBytes = [0] * numWorkers
+		'''The total size of the files given to each worker.'''
+		self.secondsPerByte = secondsPerByte
+		'''The cost of a byte the prediction was made with, or None if not known.'''
+		self.predictedMakespan = None
+		'''How long the whole thing should take, from the largest share and the cost of a byte, or None if the cost is not known.'''
+		self.workerSeconds = None
+		'''The time each worker actually took, once run.'''
+		self.actualMakespan = None
+		'''The time the whole thing actually took, once run.'''
+		loadHeap = [(0, wi) for wi in range(numWorkers)]
+		for fi in sorted(range(len(self.filePaths)), key = lambda i: -self.fileSizes[i]):
+			curLoad, wi = heapq.heappop(loadHeap)
+			self.workerFiles[wi].append(fi)
+			self.workerBytes[wi] = curLoad + self.fileSizes[fi]
+			heapq.heappush(loadHeap, (self.workerBytes[wi], wi))
+		if byDevice:
+			for curFiles in self.workerFiles:
+				curFiles.sort(key = lambda i: fileKeys[i])
+		if secondsPerByte is not None:
+			self.predictedMakespan = max(self.workerBytes) * secondsPerByte
+	def orderedBytes(self):
+		'''
+		Figure the most any worker would get if the files were split in argument order instead.
+		@return: The number of bytes.
+		'''
+		numWorkers = len(self.workerFiles)
+		numFiles = len(self.filePaths)
+		return max(sum(self.fileSizes[((wi * numFiles) // numWorkers):(((wi + 1) * numFiles) // numWorkers)]) for wi in range(numWorkers))
+	def predictedImbalance(self):
+		'''
+		Figure how much longer the slowest worker should take than the average one, going by bytes.
+		@return: The largest share over the mean share (1 is perfectly even).
+		'''
+		totBytes = sum(self.workerBytes)
+		if totBytes == 0:
+			return 1.0
+		return max(self.workerBytes) * len(self.workerBytes) / totBytes
+	def actualImbalance(self):
+		'''
+		Figure how much longer the slowest worker took than the average one.
+		@return: The longest time over the mean time, or None if it has not been run.
+		'''
+		if self.workerSeconds is None:
+			return None
+		totSecs = sum(self.workerSeconds)
+		if totSecs == 0:
+			return 1.0
+		return max(self.workerSeconds) * len(self.workerSeconds) / totSecs
+	def measuredSecondsPerByte(self):
+		'''
+		Figure how long a byte of file took to work on, for planning later runs.
+		@return: The cost in seconds, or None if it has not been run (or there were no bytes).
+		'''
+		if self.workerSeconds is None:
+			return None
+		totBytes = sum(self.workerBytes)
+		if totBytes == 0:
+			return None
+		return sum(self.workerSeconds) / totBytes
+	def summary(self):
+		'''
+		Summarize the plan, and how it went.
+		@return: A line of text.
+		'''
+		sumText = str(len(self.filePaths)) + " files on " + str(len(self.workerFiles)) + " workers, largest share " + formatMemorySizeRounded(max(self.workerBytes)) + " of " + formatMemorySizeRounded(sum(self.workerBytes)) + " (argument order " + formatMemorySizeRounded(self.orderedBytes()) + ")"
+		sumText = sumText + ("; imbalance predicted %.2f" % self.predictedImbalance())
+		if self.workerSeconds is not None:
+			sumText = sumText + (", actual %.2f" % self.actualImbalance())
+		if self.predictedMakespan is not None:
+			sumText = sumText + ("; makespan predicted %.3f s" % self.predictedMakespan)
+		if self.actualMakespan is not None:
+			sumText = sumText + ((", actual %.3f s" if (self.predictedMakespan is not None) else "; makespan %.3f s") % self.actualMakespan)
+		return sumText
+
+
+def _checkReadMode(forOpt, mode):
+	'''
+	Make sure an input is not being opened for writing.
+	@param forOpt: The file read option.
+	@param mode: The mode asked for.
+	'''
+	if not (mode in ("r", "rb", "rt")):
+		raise ValueError("Can only open " + forOpt.name + " for reading, not " + mode)
+
+
 class ArgumentOptionFileRead(ArgumentOptionString):
 	'''Read a file.'''
 	def __init__(self, baseArg,repName,sumText,useText):
@@ -626,6 +2546,25 @@ class ArgumentOptionFileRead(ArgumentOptionString):
 	def idiotCheck(self):
 		if self.required and (len(self.value) == 0):
 			raise ValueError("Missing value for " + self.name)
+	def checkPaths(self):
+		return _optionCheckPaths(self, False)
+	def idiotCheckPaths(self, statCache):
+		_checkOptionPaths(self, statCache, False, False)
+	def open(self, mode = "rb"):
+		'''
+		Open the file, decompressing by its extension.
+		@param mode: rb or rt.
+		@return: The opened stream.
+		'''
+		_checkReadMode(self, mode)
+		return openFile(self.value, mode)
+	def mmap(self, advice = "sequential"):
+		'''
+		Map the file into memory, without copying it.
+		@param advice: How the data will be used (normal, sequential, random or willneed).
+		@return: A read-only memoryview of the contents.
+		'''
+		return mapFile(self.value, advice)
 	def dumpInfo(self,toStr):
 		'''
 		Dump packed info on this thing.
@@ -653,6 +2592,18 @@ class ArgumentOptionFileWrite(ArgumentOptionString):
 	def idiotCheck(self):
 		if self.required and (len(self.value) == 0):
 			raise ValueError("Missing value for " + self.name)
+	def checkPaths(self):
+		return _optionCheckPaths(self, True)
+	def idiotCheckPaths(self, statCache):
+		_checkOptionPaths(self, statCache, True, False)
+	def open(self, mode = "wb", numThreads = None):
+		'''
+		Open the file, compressing by its extension.
+		@param mode: wb, wt, ab or at.
+		@param numThreads: The number of threads to compress on, or None to use the available cpus.
+		@return: The opened stream.
+		'''
+		return openFile(self.value, mode, numThreads = numThreads)
 	def dumpInfo(self,toStr):
 		'''
 		Dump packed info on this thing.
@@ -675,6 +2626,28 @@ class ArgumentOptionFileReadVector(ArgumentOptionStringVector):
 		self.extTypeCode = "fileread"
 		self.validExts = set()
 		'''The valid extensions for this option.'''
+		self.shardable = True
+	def checkPaths(self):
+		return _optionCheckPaths(self, False)
+	def idiotCheckPaths(self, statCache):
+		_checkOptionPaths(self, statCache, False, False)
+	def open(self, index, mode = "rb"):
+		'''
+		Open one of the files, decompressing by its extension.
+		@param index: The index of the file.
+		@param mode: rb or rt.
+		@return: The opened stream.
+		'''
+		_checkReadMode(self, mode)
+		return openFile(self.value[index], mode)
+	def mmap(self, index, advice = "sequential"):
+		'''
+		Map one of the files into memory, without copying it.
+		@param index: The index of the file.
+		@param advice: How the data will be used (normal, sequential, random or willneed).
+		@return: A read-only memoryview of the contents.
+		'''
+		return mapFile(self.value[index], advice)
 	def dumpInfo(self,toStr):
 		'''
 		Dump packed info on this thing.
@@ -697,6 +2670,19 @@ class ArgumentOptionFileWriteVector(ArgumentOptionStringVector):
 		self.extTypeCode = "filewrite"
 		self.validExts = set()
 		'''The valid extensions for this option.'''
+	def checkPaths(self):
+		return _optionCheckPaths(self, True)
+	def idiotCheckPaths(self, statCache):
+		_checkOptionPaths(self, statCache, True, False)
+	def open(self, index, mode = "wb", numThreads = None):
+		'''
+		Open one of the files, compressing by its extension.
+		@param index: The index of the file.
+		@param mode: wb, wt, ab or at.
+		@param numThreads: The number of threads to compress on, or None to use the available cpus.
+		@return: The opened stream.
+		'''
+		return openFile(self.value[index], mode, numThreads = numThreads)
 	def dumpInfo(self,toStr):
 		'''
 		Dump packed info on this thing.
@@ -719,6 +2705,28 @@ class ArgumentOptionFileReadGreedyVector(ArgumentOptionStringGreedyVector):
 		self.extTypeCode = "fileread"
 		self.validExts = set()
 		'''The valid extensions for this option.'''
+		self.shardable = True
+	def checkPaths(self):
+		return _optionCheckPaths(self, False)
+	def idiotCheckPaths(self, statCache):
+		_checkOptionPaths(self, statCache, False, False)
+	def open(self, index, mode = "rb"):
+		'''
+		Open one of the files, decompressing by its extension.
+		@param index: The index of the file.
+		@param mode: rb or rt.
+		@return: The opened stream.
+		'''
+		_checkReadMode(self, mode)
+		return openFile(self.value[index], mode)
+	def mmap(self, index, advice = "sequential"):
+		'''
+		Map one of the files into memory, without copying it.
+		@param index: The index of the file.
+		@param advice: How the data will be used (normal, sequential, random or willneed).
+		@return: A read-only memoryview of the contents.
+		'''
+		return mapFile(self.value[index], advice)
 	def dumpInfo(self,toStr):
 		'''
 		Dump packed info on this thing.
@@ -741,6 +2749,19 @@ class ArgumentOptionFileWriteGreedyVector(ArgumentOptionStringGreedyVector):
 		self.extTypeCode = "filewrite"
 		self.validExts = set()
 		'''The valid extensions for this option.'''
+	def checkPaths(self):
+		return _optionCheckPaths(self, True)
+	def idiotCheckPaths(self, statCache):
+		_checkOptionPaths(self, statCache, True, False)
+	def open(self, index, mode = "wb", numThreads = None):
+		'''
+		Open one of the files, compressing by its extension.
+		@param index: The index of the file.
+		@param mode: wb, wt, ab or at.
+		@param numThreads: The number of threads to compress on, or None to use the available cpus.
+		@return: The opened stream.
+		'''
+		return openFile(self.value[index], mode, numThreads = numThreads)
 	def dumpInfo(self,toStr):
 		'''
 		Dump packed info on this thing.
@@ -766,6 +2787,10 @@ class ArgumentOptionFolderRead(ArgumentOptionString):
 	def idiotCheck(self):
 		if self.required and (len(self.value) == 0):
 			raise ValueError("Missing value for " + self.name)
+	def checkPaths(self):
+		return _optionCheckPaths(self, False)
+	def idiotCheckPaths(self, statCache):
+		_checkOptionPaths(self, statCache, False, True)
 
 
 class ArgumentOptionFolderWrite(ArgumentOptionString):
@@ -785,6 +2810,339 @@ class ArgumentOptionFolderWrite(ArgumentOptionString):
 	def idiotCheck(self):
 		if self.required and (len(self.value) == 0):
 			raise ValueError("Missing value for " + self.name)
+	def checkPaths(self):
+		return _optionCheckPaths(self, True)
+	def idiotCheckPaths(self, statCache):
+		_checkOptionPaths(self, statCache, True, True)
+
+
+_sigilCanParse = set([ArgumentOptionHelp.canParse, ArgumentOptionVersion.canParse, ArgumentOptionArgdump.canParse, ArgumentOptionIdiot.canParse, ArgumentOptionTiming.canParse, ArgumentOptionShard.canParse, ArgumentOptionNamed.canParse, ArgumentOptionNull.canParse])
+'''The implementations of canParse that just look for one of the sigils.'''
+
+
+class ArgumentOptionIndex:
+	'''Find the option to parse an argument by sigil, instead of asking each option.'''
+	def __init__(self, forOpts):
+		'''
+		Index a set of options.
+		@param forOpts: The options to index, in priority order.
+		'''
+		self.sigilMap = {}
+		'''The options that just look at sigils: sigil to (priority, option).'''
+		self.custom = []
+		'''The options with their own canParse, as (priority, option), in priority order.'''
+		for i in range(len(forOpts)):
+			subArg = forOpts[i]
+			if type(subArg).canParse in _sigilCanParse:
+				for csig in subArg.sigils:
+					if not (csig in self.sigilMap):
+						self.sigilMap[csig] = (i, subArg)
+			else:
+				self.custom.append((i, subArg))
+	def find(self, forArgs, atInd):
+		'''
+		Find the option that should handle an argument.
+		@param forArgs: All the arguments.
+		@param atInd: The index of the argument to handle.
+		@return: The option to use, or None if nothing can handle it.
+		'''
+		hit = self.sigilMap.get(forArgs[atInd])
+		if len(self.custom) == 0:
+			return None if (hit is None) else hit[1]
+		subArgs = ArgumentSlice(forArgs, atInd)
+		for pri, subArg in self.custom:
+			if (hit is not None) and (pri > hit[0]):
+				break
+			if subArg.canParse(subArgs):
+				return subArg
+		return None if (hit is None) else hit[1]
+
+
+_sliceParseCache = {}
+'''Whether each option class was written against parse instead of parseAt.'''
+
+def _usesSliceParse(optCls):
+	'''
+	Get whether an option class overrides parse more recently than parseAt.
+	@param optCls: The class of the option.
+	@return: Whether parseAt should go through the parse adapter.
+	'''
+	useSlice = _sliceParseCache.get(optCls)
+	if useSlice is None:
+		useSlice = False
+		for cls in optCls.__mro__:
+			if "parseAt" in vars(cls):
+				break
+			if "parse" in vars(cls):
+				useSlice = True
+				break
+		_sliceParseCache[optCls] = useSlice
+	return useSlice
+
+
+def parseOptionAt(forOpt, forArgs, atInd, forProg):
+	'''
+	Have an option parse, using parseAt unless a subclass only overrides parse.
+	@param forOpt: The option to parse with.
+	@param forArgs: All the arguments.
+	@param atInd: The index of the first argument to consider parsing.
+	@param forProg: The program this is parsing for.
+	@return: The index of the first argument not consumed.
+	'''
+	if _usesSliceParse(type(forOpt)):
+		return ArgumentOption.parseAt(forOpt, forArgs, atInd, forProg)
+	return forOpt.parseAt(forArgs, atInd, forProg)
+
+
+def _compiledValueCode(setCode):
+	'''
+	Make the inline code for an option that takes one value.
+	@param setCode: The code to store the value (as curV).
+	@return: The lines of code.
+	'''
+	return ["if (i + 1) >= numArgs:", "\traise IndexError(\"No value provided for \" + o.name)", "curV = forArgs[i + 1]", setCode, "i += 2"]
+
+_compiledParseCode = [
+	(ArgumentOptionFlag.parseAt, ["o.value = True", "i += 1"]),
+	(ArgumentOptionEnum.parseAt, ["o.myClass.value = o.setValue", "i += 1"]),
+	(ArgumentOptionIdiot.parseAt, ["prog.needRun = False", "i += 1"]),
+	(ArgumentOptionNull.parseAt, ["i += 1"]),
+	(ArgumentOptionInteger.parseAt, _compiledValueCode("o.value = int(curV)")),
+	(ArgumentOptionFloat.parseAt, _compiledValueCode("o.value = float(curV)")),
+	(ArgumentOptionString.parseAt, _compiledValueCode("o.value = curV")),
+	(ArgumentOptionIntegerVector.parseAt, _compiledValueCode("o.value.append(int(curV))")),
+	(ArgumentOptionFloatVector.parseAt, _compiledValueCode("o.value.append(float(curV))")),
+	(ArgumentOptionStringVector.parseAt, _compiledValueCode("o.value.append(curV)"))
+]
+'''The parseAt implementations that compiled parsers inline, and the code to do so.'''
+
+_compiledParseCache = {}
+'''Compiled parser factories, by program class and the kinds of options it has.'''
+
+def _compiledParseKind(forOpt):
+	'''
+	Get the kind of inline code to use for an option.
+	@param forOpt: The option in question.
+	@return: The index in _compiledParseCode, or -1 to call parseAt.
+	'''
+	optCls = type(forOpt)
+	if _usesSliceParse(optCls):
+		return -1
+	for i in range(len(_compiledParseCode)):
+		if optCls.parseAt is _compiledParseCode[i][0]:
+			return i
+	return -1
+
+def _makeCompiledParseFactory(useKinds):
+	'''
+	Generate the source for a specialized parse loop, and compile it.
+	@param useKinds: The kinds of option to inline, most common first.
+	@return: A function that takes a sigil dispatch table and returns a parse function.
+	'''
+	codeL = []
+	codeL.append("def makeCompiledParse(dispatch):")
+	codeL.append("\tdef compiledParse(prog, forArgs):")
+	codeL.append("\t\tnumArgs = len(forArgs)")
+	codeL.append("\t\ti = 0")
+	codeL.append("\t\twhile i < numArgs:")
+	codeL.append("\t\t\thit = dispatch.get(forArgs[i])")
+	codeL.append("\t\t\tif hit is None:")
+	codeL.append("\t\t\t\traise KeyError(\"Unknown command line argument: \" + forArgs[i])")
+	codeL.append("\t\t\tkind, o = hit")
+	for kind in useKinds:
+		codeL.append("\t\t\t" + ("if" if (kind == useKinds[0]) else "elif") + " kind == " + str(kind) + ":")
+		for line in _compiledParseCode[kind][1]:
+			codeL.append("\t\t\t\t" + line)
+	if len(useKinds) == 0:
+		codeL.append("\t\t\ti = parseOptionAt(o, forArgs, i, prog)")
+	else:
+		codeL.append("\t\t\telse:")
+		codeL.append("\t\t\t\ti = parseOptionAt(o, forArgs, i, prog)")
+	codeL.append("\treturn compiledParse")
+	genNS = {"parseOptionAt": parseOptionAt}
+	exec(compile("\n".join(codeL) + "\n", "<whodunargs compiled parse>", "exec"), genNS)
+	return genNS["makeCompiledParse"]
+
+def _parseStateSummary(forProg):
+	'''
+	Summarize everything parsing can change in a program, for comparison.
+	@param forProg: The program to summarize.
+	@return: The summary.
+	'''
+	allState = [forProg.needRun, forProg.needIdiot, forProg.wasError, forProg.useOut.getvalue(), forProg.useErr.getvalue()]
+	for subArg in forProg.options:
+		curV = getattr(subArg, "value", None)
+		if callable(curV):
+			curV = curV()
+		if isinstance(curV, collections.abc.Sequence) and not isinstance(curV, str):
+			curV = list(curV)
+		allState.append(repr(curV))
+		for extAttr in ("isAuto", "shardIndex", "shardCount", "shardMode"):
+			if hasattr(subArg, extAttr):
+				allState.append(repr(getattr(subArg, extAttr)))
+	return allState
+
+
+def readArgumentFile(filePath, blockSize = 1048576):
+	'''
+	Read the arguments in a response file, a block at a time.
+	Arguments are separated by NUL characters if the first block has any, or by lines otherwise (blank lines are skipped).
+	@param filePath: The file to read.
+	@param blockSize: The number of bytes to read at a time.
+	@return: An iterator over the arguments in the file.
+	'''
+	with open(filePath, "rb", buffering=0) as inF:
+		decoder = codecs.getincrementaldecoder("utf-8")()
+		sepChar = None
+		leftover = ""
+		while True:
+			curB = inF.read(blockSize)
+			if sepChar is None:
+				sepChar = "\0" if (b"\0" in curB) else "\n"
+			curS = leftover + decoder.decode(curB, len(curB) == 0)
+			curParts = curS.split(sepChar)
+			leftover = curParts.pop()
+			if len(curB) == 0:
+				if len(leftover) > 0:
+					curParts.append(leftover)
+				leftover = ""
+			if sepChar == "\n":
+				for part in curParts:
+					if part[-1:] == "\r":
+						part = part[:-1]
+					if len(part) > 0:
+						yield part
+			else:
+				yield from curParts
+			if len(curB) == 0:
+				return
+
+
+def _nthSeparator(curB, recordSep, fromI, numWant, recordLen):
+	'''
+	Find where some number of records ends, jumping ahead by the typical record length and counting, rather than looking at every record.
+	@param curB: The block to look in: it must have at least numWant separators from fromI on.
+	@param recordSep: The single byte that ends each record.
+	@param fromI: Where to start looking.
+	@param numWant: The number of records to go past (at least one).
+	@param recordLen: The typical length of a record, in bytes.
+	@return: The index of the separator that ends the last of them.
+	'''
+	sepI = fromI - 1
+	while numWant > 16:
+		guessI = min(len(curB), sepI + 1 + numWant * recordLen)
+		numHave = curB.count(recordSep, sepI + 1, guessI)
+		if numHave < numWant:
+			# all short of the end: skip past them
+			recordLen = max(1, (guessI - sepI - 1) // numHave) if (numHave > 0) else (2 * recordLen)
+			sepI = guessI - 1
+			numWant = numWant - numHave
+		elif (numHave - numWant) < 16:
+			# just past the end: back up
+			for i in range(numHave - numWant + 1):
+				guessI = curB.rfind(recordSep, sepI + 1, guessI)
+			return guessI
+		else:
+			recordLen = max(1, (guessI - sepI - 1) // numHave)
+	for i in range(numWant):
+		sepI = curB.find(recordSep, sepI + 1)
+	return sepI
+
+
+def splitRecordChunks(fromStr, recordsPer, recordSep = b"\n", blockSize = 1048576):
+	'''
+	Read a stream in big blocks and cut it into chunks of whole records.
+	Reads take whatever is available (up to a block), so chunks from a live pipe go out as soon as they are complete.
+	Separators are counted a block at a time: only blocks where a chunk ends are searched.
+	@param fromStr: The binary stream to read.
+	@param recordsPer: The number of records in each chunk. A new number can be sent to the iterator, for the chunks after the one it last gave.
+	@param recordSep: The single byte that ends each record.
+	@param blockSize: The most bytes to read at a time.
+	@return: An iterator over the chunks (bytes). The last record may be missing its separator.
+	'''
+	if len(recordSep) != 1:
+		raise ValueError("Record separator must be a single byte.")
+	recordsPer = max(1, recordsPer)
+	readFun = fromStr.read1 if hasattr(fromStr, "read1") else fromStr.read
+	chunkParts = []
+	numWant = recordsPer
+	while True:
+		curB = readFun(blockSize)
+		if not curB:
+			break
+		numSep = curB.count(recordSep)
+		recordLen = max(1, len(curB) // max(1, numSep))
+		chunkStart = 0
+		while numSep >= numWant:
+			sepI = curB.find(recordSep, chunkStart)
+			if numWant > 16:
+				sepI = _nthSeparator(curB, recordSep, sepI + 1, numWant - 1, recordLen)
+			else:
+				for i in range(numWant - 1):
+					sepI = curB.find(recordSep, sepI + 1)
+			if len(chunkParts) > 0:
+				chunkParts.append(curB[chunkStart:(sepI + 1)])
+				sentPer = yield b"".join(chunkParts)
+				chunkParts = []
+			else:
+				sentPer = yield curB[chunkStart:(sepI + 1)]
+			if sentPer is not None:
+				recordsPer = max(1, sentPer)
+			numSep = numSep - numWant
+			numWant = recordsPer
+			chunkStart = sepI + 1
+		numWant = numWant - numSep
+		if chunkStart < len(curB):
+			chunkParts.append(curB[chunkStart:])
+	if len(chunkParts) > 0:
+		yield b"".join(chunkParts)
+
+
+def _readRecordChunks(chunkIter, toQueue, stopFlag):
+	'''
+	Read chunks of records into a bounded queue, in a reader thread.
+	@param chunkIter: The chunks to read, from splitRecordChunks.
+	@param toQueue: The queue to put (chunk, error) pairs in: a chunk of None marks the end.
+	@param stopFlag: Set if the reader should give up early.
+	'''
+	def putItem(curItem):
+		while not stopFlag.is_set():
+			try:
+				toQueue.put(curItem, timeout = 0.1)
+				return True
+			except queue.Full:
+				pass
+		return False
+	try:
+		for curChunk in chunkIter:
+			if not putItem((curChunk, None)):
+				return
+		putItem((None, None))
+	except BaseException as readErr:
+		putItem((None, readErr))
+
+
+def _sendChunk(chunkIter, recordsPer):
+	'''
+	Change the number of records in the chunks from splitRecordChunks, and get the next one.
+	@param chunkIter: The chunks.
+	@param recordsPer: The new number of records in each chunk.
+	@return: The next chunk, or None if there are no more.
+	'''
+	try:
+		return chunkIter.send(recordsPer)
+	except StopIteration:
+		return None
+
+
+def _mapChunk(mapFun, forItems):
+	'''
+	Apply a function to a chunk of things, in a worker.
+	@param mapFun: The function to apply.
+	@param forItems: The things to apply it to.
+	@return: The results.
+	'''
+	return [mapFun(item) for item in forItems]
 
 
 class StandardProgram:
@@ -793,6 +3151,8 @@ class StandardProgram:
 		'''
 		Set up basic stuff for a program.
 		'''
+		self.constructTime = time.perf_counter()
+		'''When this program started being set up.'''
 		self.name = ""
 		'''The name of this program.'''
 		self.summary = ""
@@ -803,7 +3163,7 @@ class StandardProgram:
 		'''An example of the usage of this program.'''
 		self.version = ""
 		'''Version information on this program.'''
-		self.options = [ArgumentOptionHelp(),ArgumentOptionVersion(),ArgumentOptionArgdump(),ArgumentOptionIdiot()]
+		self.options = [ArgumentOptionHelp(),ArgumentOptionVersion(),ArgumentOptionArgdump(),ArgumentOptionIdiot(),ArgumentOptionTiming(),ArgumentOptionShard()]
 		'''The options of this program.'''
 		self.useIn = sys.stdin.buffer
 		'''Where to get input from.'''
@@ -817,30 +3177,155 @@ class StandardProgram:
 		'''Whether this thing needs to idiot check.'''
 		self.wasError = False
 		'''Whether there were any errors.'''
+		self.argumentFiles = False
+		'''Whether arguments of the form @path should be replaced by the arguments in that file (off by default, since values may start with @).'''
+		self.compiledParse = None
+		'''A parse loop specialized for this program, from compile, or None to use the generic one.'''
+		self.timings = None
+		'''Where to log how long things take, or None if not timing.'''
+		self.statCache = ArgumentStatCache()
+		'''Looked up info on the files and folders named in the arguments.'''
+		self.statThreads = 16
+		'''The maximum number of file system lookups to have going at once when checking arguments.'''
+		self.checkFileSystem = True
+		'''Whether to check that the files and folders named in the arguments exist and can be used.'''
+		self.fileSecondsPerByte = None
+		'''How long a byte of file took in the last runFileWork, used to predict the next plan.'''
+		self.executors = {}
+		'''The worker pools that have been made, by whether they use processes.'''
+		self.sharedInputs = None
+		'''Inputs put in shared memory for process workers, if any.'''
+		self.memoryLimiter = None
+		'''The gate keeping work under the memory budget, once made.'''
 	def parse(self,forArgs):
 		'''
 		Parse the arguments of this program.
 		@param forArgs: The arguments of interest.
 		'''
+		# --help_timing turns the log on when it is parsed, so the clock starts here regardless
+		parseStart = time.perf_counter()
+		parseEnd = None
 		try:
-			curArgs = forArgs[:]
-			while(len(curArgs) > 0):
-				handled = False
-				for subArg in self.options:
-					if subArg.canParse(curArgs):
-						curArgs = subArg.parse(curArgs, self)
-						handled = True
-						break
-				if not handled:
-					raise KeyError("Unknown command line argument: " + curArgs[0])
+			if self.argumentFiles:
+				forArgs = self.expandArgumentFiles(forArgs)
+			if self.compiledParse is None:
+				self.parseGeneric(forArgs)
+			else:
+				self.compiledParse(self, forArgs)
+			parseEnd = time.perf_counter()
+			self.applyShard()
 			if self.needIdiot:
 				self.idiotCheckArguments()
-				self.idiotCheck()
+				if self.timings is None:
+					self.idiotCheck()
+				else:
+					startT = time.perf_counter()
+					self.idiotCheck()
+					self.timings.record("Program", "idiotCheck", time.perf_counter() - startT)
 		except Exception as e:
 			self.wasError = True
 			self.needRun = False
 			self.useErr.write(bytes(str(e)+"\n","utf-8"))
+		if self.timings is not None:
+			self.timings.record("Program", "construct", parseStart - self.constructTime)
+			self.timings.record("Program", "parse", (time.perf_counter() if (parseEnd is None) else parseEnd) - parseStart)
+		if (self.timings is not None) and not self.needRun:
+			self.timings.printTable(self.useErr)
 		return
+	def applyShard(self):
+		'''
+		Cut the shardable options (and the options paired with them) down to this run's share, if --help_shard was given.
+		Output file lists that are not paired with anything cannot be split to match, so more than one of them is an error.
+		'''
+		shardOpt = self.findOption(ArgumentOptionShard)
+		if (shardOpt is None) or (shardOpt.shardCount is None):
+			return
+		shardKept = {}
+		for subArg in self.options:
+			if subArg.shardable:
+				numBefore = len(subArg.value)
+				keepInds = shardIndices(subArg.value, shardOpt.shardIndex, shardOpt.shardCount, shardOpt.shardMode, self.statCache, self.statThreads)
+				subArg.value = keepIndices(subArg.value, keepInds)
+				shardKept[subArg] = (numBefore, keepInds)
+				if self.timings is not None:
+					self.timings.note(subArg.name, "shard kept " + str(len(subArg.value)) + " of " + str(numBefore))
+		for subArg in self.options:
+			if subArg.shardWith is not None:
+				if not (subArg.shardWith in shardKept):
+					raise ValueError(subArg.name + " is paired with " + subArg.shardWith.name + ", which is not sharded.")
+				numBefore, keepInds = shardKept[subArg.shardWith]
+				if len(subArg.value) != numBefore:
+					raise ValueError(subArg.name + " needs one value for each of " + subArg.shardWith.name + " to be sharded.")
+				subArg.value = keepIndices(subArg.value, keepInds)
+			elif isinstance(subArg, (ArgumentOptionFileWriteVector, ArgumentOptionFileWriteGreedyVector)) and (len(subArg.value) > 1):
+				raise ValueError(subArg.name + " cannot be split between shards: give it one value, or pair it (shardWith) with the inputs it goes with.")
+	def parseGeneric(self, forArgs):
+		'''
+		Have the options parse the arguments, asking each option as needed.
+		@param forArgs: The arguments of interest.
+		'''
+		optInd = ArgumentOptionIndex(self.options)
+		curInd = 0
+		while curInd < len(forArgs):
+			subArg = optInd.find(forArgs, curInd)
+			if subArg is None:
+				raise KeyError("Unknown command line argument: " + forArgs[curInd])
+			if self.timings is None:
+				curInd = parseOptionAt(subArg, forArgs, curInd, self)
+			else:
+				startT = time.perf_counter()
+				curInd = parseOptionAt(subArg, forArgs, curInd, self)
+				self.timings.record(subArg.name, "parse", time.perf_counter() - startT)
+	def compile(self, checkArgs = None):
+		'''
+		Build a parse loop specialized for the options of this program: call once the options are set up.
+		Does nothing if any option has its own canParse.
+		@param checkArgs: A list of argument lists to check the specialized parser against the generic one on, using new copies of this program.
+		'''
+		optInd = ArgumentOptionIndex(self.options)
+		if len(optInd.custom) > 0:
+			return
+		dispatch = {}
+		kindCounts = {}
+		for csig in optInd.sigilMap:
+			subArg = optInd.sigilMap[csig][1]
+			kind = _compiledParseKind(subArg)
+			dispatch[csig] = (kind, subArg)
+			kindCounts[kind] = kindCounts.get(kind, 0) + 1
+		useKinds = sorted([kind for kind in kindCounts if kind >= 0], key = lambda kind: (-kindCounts[kind], kind))
+		cacheKey = (type(self), tuple(useKinds))
+		makeParse = _compiledParseCache.get(cacheKey)
+		if makeParse is None:
+			makeParse = _makeCompiledParseFactory(useKinds)
+			_compiledParseCache[cacheKey] = makeParse
+		self.compiledParse = makeParse(dispatch)
+		# make sure it does the same thing
+		if checkArgs is not None:
+			for curArgs in checkArgs:
+				progs = [type(self)(), type(self)()]
+				progs[1].compile()
+				for prog in progs:
+					prog.useOut = io.BytesIO()
+					prog.useErr = io.BytesIO()
+					prog.parse(curArgs)
+				if _parseStateSummary(progs[0]) != _parseStateSummary(progs[1]):
+					raise ValueError("Compiled parser disagrees with generic parser on: " + " ".join(curArgs))
+	def expandArgumentFiles(self, forArgs):
+		'''
+		Replace any @path arguments with the arguments in that file.
+		@param forArgs: The arguments as given.
+		@return: The arguments to actually parse.
+		'''
+		expArgs = None
+		for i in range(len(forArgs)):
+			curA = forArgs[i]
+			if (len(curA) > 1) and (curA[0] == "@"):
+				if expArgs is None:
+					expArgs = list(forArgs[:i])
+				expArgs.extend(readArgumentFile(curA[1:]))
+			elif expArgs is not None:
+				expArgs.append(curA)
+		return forArgs if (expArgs is None) else expArgs
 	def idiotCheck(self):
 		'''
 		Any additional idiot checks before running.
@@ -850,15 +3335,41 @@ class StandardProgram:
 		'''
 		Let the individual arguments idiot check.
 		'''
+		if self.checkFileSystem:
+			if self.timings is not None:
+				startT = time.perf_counter()
+			allPaths = []
+			for subArg in self.options:
+				allPaths.extend(subArg.checkPaths())
+			self.statCache.prefetch(allPaths, self.statThreads)
+			if self.timings is not None:
+				self.timings.record("Program", "stat", time.perf_counter() - startT)
 		for subArg in self.options:
-			subArg.idiotCheck()
+			if self.timings is None:
+				subArg.idiotCheck()
+				if self.checkFileSystem:
+					subArg.idiotCheckPaths(self.statCache)
+			else:
+				startT = time.perf_counter()
+				subArg.idiotCheck()
+				if self.checkFileSystem:
+					subArg.idiotCheckPaths(self.statCache)
+				self.timings.record(subArg.name, "idiotCheck", time.perf_counter() - startT)
 	def run(self):
 		'''
 		Run the program.
 		'''
 		try:
 			if self.needRun:
-				self.baseRun()
+				startT = time.perf_counter()
+				try:
+					self.baseRun()
+				finally:
+					self.shutdownExecutors(sys.exc_info()[0] is not None)
+					self.releaseSharedInputs()
+					if self.timings is not None:
+						self.timings.record("Program", "run", time.perf_counter() - startT)
+						self.timings.printTable(self.useErr)
 		except Exception as e:
 			self.wasError = True
 			self.useErr.write(bytes(str(e)+"\n","utf-8"))
@@ -868,6 +3379,421 @@ class StandardProgram:
 		Actually do the thing.
 		'''
 		raise NotImplementedError("Use a subclass.")
+	def findOption(self, optClass):
+		'''
+		Find an option of a given type.
+		@param optClass: The type of option to look for.
+		@return: The first option of that type, or None if there is none.
+		'''
+		for subArg in self.options:
+			if isinstance(subArg, optClass):
+				return subArg
+		return None
+	def threadCount(self):
+		'''
+		Get the number of workers to use.
+		@return: The value of the threadcount option, or 1 if there is none.
+		'''
+		threadOpt = self.findOption(ArgumentOptionThreadcount)
+		return 1 if (threadOpt is None) else threadOpt.value
+	def threadGrain(self):
+		'''
+		Get the number of things each worker should do at a time.
+		@return: The value of the threadgrain option, or 65536 if there is none.
+		'''
+		grainOpt = self.findOption(ArgumentOptionThreadgrain)
+		return 65536 if (grainOpt is None) else grainOpt.value
+	def getExecutor(self, useProcess = False):
+		'''
+		Get a pool of workers sized by the threadcount option: it will be shut down when run finishes.
+		@param useProcess: Whether to use processes instead of threads.
+		@return: The pool.
+		'''
+		import multiprocessing
+		import concurrent.futures
+		curPool = self.executors.get(useProcess)
+		if curPool is None:
+			workerPlan = self.affinityPlan()
+			if useProcess:
+				sharedHandles = {} if (self.sharedInputs is None) else dict(self.sharedInputs.handles)
+				curPool = concurrent.futures.ProcessPoolExecutor(max_workers = self.threadCount(), initializer = _initProcessWorker, initargs = (workerPlan, multiprocessing.Value("i", 0), sharedHandles))
+			else:
+				if workerPlan is None:
+					curPool = concurrent.futures.ThreadPoolExecutor(max_workers = self.threadCount())
+				else:
+					curPool = concurrent.futures.ThreadPoolExecutor(max_workers = self.threadCount(), initializer = _pinThreadWorker, initargs = (workerPlan, itertools.count()))
+			self.executors[useProcess] = curPool
+		return curPool
+	def affinityPlan(self):
+		'''
+		Get which cpus each worker should be pinned to.
+		@return: The cpus for each worker, or None if workers should not be pinned.
+		'''
+		affOpt = self.findOption(ArgumentOptionAffinity)
+		if (affOpt is None) or (len(affOpt.value) == 0):
+			return None
+		return planAffinity(affOpt.value, self.threadCount())
+	def threadSchedule(self):
+		'''
+		Get how to split up loops between threads.
+		@return: The value of the schedule option, or dynamic if there is none.
+		'''
+		schedOpt = self.findOption(ArgumentOptionSchedule)
+		return "dynamic" if (schedOpt is None) else schedOpt.value
+	def parallelFor(self, loopFun, forItems, schedule = None, chunkSize = None):
+		'''
+		Apply a function to a bunch of things on the thread pool, handing out chunks by a schedule.
+		@param loopFun: The function to apply.
+		@param forItems: The things to apply it to.
+		@param schedule: The schedule to use (static, dynamic or guided), or None to use the schedule option.
+		@param chunkSize: The number of things in each chunk (smallest chunk for guided), or None to use the threadgrain option.
+		@return: The results, in order.
+		'''
+		if schedule is None:
+			schedule = self.threadSchedule()
+		if not isinstance(forItems, collections.abc.Sequence):
+			forItems = list(forItems)
+		numWorkers = self.threadCount()
+		if (numWorkers <= 1) or (len(forItems) <= 1):
+			return [loopFun(item) for item in forItems]
+		allRes = [None] * len(forItems)
+		startI = 0
+		if chunkSize is None:
+			if self.autoGrain():
+				chunkSize, startI = self.calibrateGrain(loopFun, forItems, allRes)
+			else:
+				chunkSize = self.threadGrain()
+		loopSched = ArgumentLoopScheduler(len(forItems) - startI, numWorkers, chunkSize, schedule)
+		def runWorker(workerI):
+			try:
+				while True:
+					curChunk = loopSched.nextChunk(workerI)
+					if curChunk is None:
+						return
+					for i in range(startI + curChunk[0], startI + curChunk[1]):
+						allRes[i] = loopFun(forItems[i])
+			except BaseException:
+				loopSched.stop()
+				raise
+		curPool = self.getExecutor(False)
+		allFut = [curPool.submit(runWorker, wi) for wi in range(numWorkers)]
+		for curFut in allFut:
+			curFut.result()
+		return allRes
+	def shareInput(self, inName, inData):
+		'''
+		Put a read-only input in shared memory, for process workers to get with sharedInput(inName).
+		Any process pool is restarted so that its workers can see it. Freed when run finishes.
+		@param inName: The name to share it under.
+		@param inData: The thing to share: a numeric vector option, a file read option, or anything with the buffer protocol.
+		'''
+		if self.sharedInputs is None:
+			self.sharedInputs = ArgumentSharedInputs()
+		if isinstance(inData, ArgumentOption):
+			if inData.typeCode in ("intvec", "intvecg", "floatvec", "floatvecg"):
+				optData = inData.value
+				if not isinstance(optData, array.array):
+					optData = array.array("q" if inData.typeCode.startswith("int") else "d", optData)
+				self.sharedInputs.publish(inName, optData)
+			elif (inData.extTypeCode == "fileread") and isinstance(inData.value, str):
+				self.sharedInputs.publishFile(inName, inData.value)
+			else:
+				raise ValueError("Cannot share option " + inData.name)
+		else:
+			self.sharedInputs.publish(inName, inData)
+		oldPool = self.executors.pop(True, None)
+		if oldPool is not None:
+			oldPool.shutdown(wait = True)
+	def releaseSharedInputs(self):
+		'''
+		Free any shared inputs.
+		'''
+		if self.sharedInputs is not None:
+			self.sharedInputs.close()
+			self.sharedInputs = None
+	def shutdownExecutors(self, wasFailure = False):
+		'''
+		Shut down any pools of workers.
+		@param wasFailure: Whether this is because of an error: anything that has not started is dropped.
+		'''
+		allPools = list(self.executors.values())
+		self.executors.clear()
+		for curPool in allPools:
+			curPool.shutdown(wait = True, cancel_futures = wasFailure)
+	def mapChunked(self, mapFun, forItems, chunkSize = None, useProcess = False):
+		'''
+		Apply a function to a bunch of things, handing chunks of them to the workers.
+		@param mapFun: The function to apply. Must be picklable if using processes.
+		@param forItems: The things to apply it to.
+		@param chunkSize: The number of things in each chunk, or None to use the threadgrain option.
+		@param useProcess: Whether to use processes instead of threads.
+		@return: The results, in order.
+		'''
+		if not isinstance(forItems, collections.abc.Sequence):
+			forItems = list(forItems)
+		if (self.threadCount() <= 1) or (len(forItems) <= 1):
+			return [mapFun(item) for item in forItems]
+		allRes = [None] * len(forItems)
+		startI = 0
+		if chunkSize is None:
+			if self.autoGrain():
+				chunkSize, startI = self.calibrateGrain(mapFun, forItems, allRes, useProcess)
+			else:
+				chunkSize = self.threadGrain()
+		if (len(forItems) - startI) <= chunkSize:
+			for i in range(startI, len(forItems)):
+				allRes[i] = mapFun(forItems[i])
+			return allRes
+		curPool = self.getExecutor(useProcess)
+		allFut = []
+		for i in range(startI, len(forItems), chunkSize):
+			allFut.append((i, curPool.submit(_mapChunk, mapFun, forItems[i:(i + chunkSize)])))
+		for i, curFut in allFut:
+			curRes = curFut.result()
+			allRes[i:(i + len(curRes))] = curRes
+		return allRes
+	def mapRecords(self, chunkFun, useProcess = False, recordSep = b"\n", blockSize = 1048576):
+		'''
+		Cut useIn into chunks of threadgrain records and hand them to the workers.
+		With threadgrain auto, the first few records are done here, in doubling chunks, to time the work and pick the grain.
+		Reading, working and collecting all go through bounded queues, so this can run over an endless stream.
+		With a memory budget, chunks count against it until their results are handed back.
+		@param chunkFun: The function to apply to each chunk (bytes of whole records). Must be picklable if using processes.
+		@param useProcess: Whether to use processes instead of threads.
+		@param recordSep: The single byte that ends each record.
+		@param blockSize: The number of bytes to read at a time.
+		@return: An iterator over the results for each chunk, in order.
+		'''
+		numWorkers = self.threadCount()
+		recordsPer = self.threadGrain()
+		if numWorkers <= 1:
+			for curChunk in splitRecordChunks(self.useIn, recordsPer, recordSep, blockSize):
+				yield chunkFun(curChunk)
+			return
+		if self.autoGrain():
+			# time the first few records here, in doubling chunks, then switch the rest to the picked grain
+			chunkCost = self.timeChunkCost(useProcess)
+			chunkIter = splitRecordChunks(self.useIn, 1, recordSep, blockSize)
+			curChunk = next(chunkIter, None)
+			numDone = 0
+			workTime = 0.0
+			curSize = 1
+			while curChunk is not None:
+				startT = time.perf_counter()
+				curRes = chunkFun(curChunk)
+				workTime = workTime + (time.perf_counter() - startT)
+				numDone = numDone + max(1, curChunk.count(recordSep))
+				yield curRes
+				if workTime >= 0.01:
+					break
+				curSize = 2 * curSize
+				curChunk = _sendChunk(chunkIter, curSize)
+			if curChunk is None:
+				return
+			recordsPer = self.pickGrain(chunkCost, max(workTime / numDone, 1e-9), None)
+			curChunk = _sendChunk(chunkIter, recordsPer)
+			if curChunk is None:
+				return
+			chunkIter = itertools.chain([curChunk], chunkIter)
+		else:
+			chunkIter = splitRecordChunks(self.useIn, recordsPer, recordSep, blockSize)
+		maxPending = 2 * numWorkers
+		readQueue = queue.Queue(maxPending)
+		stopFlag = threading.Event()
+		readThread = threading.Thread(target = _readRecordChunks, args = (chunkIter, readQueue, stopFlag), daemon = True)
+		readThread.start()
+		curPool = self.getExecutor(useProcess)
+		memGate = self.memoryGate()
+		allFut = collections.deque()
+		def popResult():
+			headFut, headBytes = allFut.popleft()
+			try:
+				return headFut.result()
+			finally:
+				if memGate is not None:
+					memGate.release(headBytes)
+		try:
+			while True:
+				# hand back anything finished, so results from a slow stream are not held up
+				while (len(allFut) > 0) and allFut[0][0].done():
+					yield popResult()
+				if len(allFut) >= maxPending:
+					yield popResult()
+					continue
+				try:
+					curChunk, readErr = readQueue.get(timeout = (0.01 if (len(allFut) > 0) else None))
+				except queue.Empty:
+					continue
+				if readErr is not None:
+					raise readErr
+				if curChunk is None:
+					break
+				if memGate is not None:
+					# the room is given back as results are handed back, so make room by handing back
+					while (len(allFut) > 0) and not memGate.tryAcquire(len(curChunk)):
+						yield popResult()
+					if len(allFut) == 0:
+						memGate.acquire(len(curChunk))
+				allFut.append((curPool.submit(chunkFun, curChunk), len(curChunk)))
+			while len(allFut) > 0:
+				yield popResult()
+		finally:
+			stopFlag.set()
+			for curFut, curBytes in allFut:
+				curFut.cancel()
+				if memGate is not None:
+					memGate.release(curBytes)
+			# the reader may be stuck waiting on the stream: it quits on its own once the read returns
+			readThread.join(0.5)
+	def prefetchFiles(self, filePaths, depth = None):
+		'''
+		Open a bunch of files in order, with the next few opened and read ahead on background threads.
+		Each file is closed when the next one is asked for.
+		Each open compressed file holds several MiB of read-ahead and decompressor state (see ArgumentFilePrefetcher), so keep the depth small for them.
+		@param filePaths: The files to open, or a file read vector option.
+		@param depth: The number of files to open ahead, or None to use the prefetch option (2 if there is none).
+		@return: An iterator over the opened files: close it when done.
+		'''
+		if isinstance(filePaths, ArgumentOption):
+			filePaths = filePaths.value
+		if depth is None:
+			prefOpt = self.findOption(ArgumentOptionPrefetch)
+			depth = 2 if (prefOpt is None) else prefOpt.value
+		return ArgumentFilePrefetcher(filePaths, depth)
+	def planFileWork(self, filePaths, byDevice = False, secondsPerByte = None):
+		'''
+		Split files between the workers by size.
+		@param filePaths: The files to split, or a file read vector option.
+		@param byDevice: Whether each worker should go through its files in device and inode order.
+		@param secondsPerByte: How long a byte takes to work on, for predicting the makespan, or None to use the last run's.
+		@return: The plan.
+		'''
+		if isinstance(filePaths, ArgumentOption):
+			filePaths = filePaths.value
+		if secondsPerByte is None:
+			secondsPerByte = self.fileSecondsPerByte
+		return ArgumentFileWorkPlan(filePaths, self.threadCount(), self.statCache, byDevice, secondsPerByte)
+	def runFileWork(self, workFun, workPlan):
+		'''
+		Work on files on the thread pool, following a plan: how long it took is put in the plan (and noted in the timing log), and the cost of a byte is kept to predict later plans.
+		@param workFun: The function to call on each file path.
+		@param workPlan: The plan to follow.
+		@return: The results, in the order of the files.
+		'''
+		allRes = [None] * len(workPlan.filePaths)
+		workerSecs = [0.0] * len(workPlan.workerFiles)
+		failFlag = threading.Event()
+		def runWorker(workerI):
+			startT = time.perf_counter()
+			try:
+				for fi in workPlan.workerFiles[workerI]:
+					if failFlag.is_set():
+						return
+					allRes[fi] = workFun(workPlan.filePaths[fi])
+			except BaseException:
+				failFlag.set()
+				raise
+			finally:
+				workerSecs[workerI] = time.perf_counter() - startT
+		startT = time.perf_counter()
+		if len(workPlan.workerFiles) <= 1:
+			runWorker(0)
+		else:
+			curPool = self.getExecutor(False)
+			allFut = [curPool.submit(runWorker, wi) for wi in range(len(workPlan.workerFiles))]
+			for curFut in allFut:
+				curFut.result()
+		workPlan.actualMakespan = time.perf_counter() - startT
+		workPlan.workerSeconds = workerSecs
+		if workPlan.measuredSecondsPerByte() is not None:
+			self.fileSecondsPerByte = workPlan.measuredSecondsPerByte()
+		if self.timings is not None:
+			self.timings.note("File Work", workPlan.summary())
+		return allRes
+	def openOutput(self, ordered = True, flushBytes = 1048576):
+		'''
+		Get a writer that collects results from workers and writes them to useOut.
+		@param ordered: Whether to write results in sequence order.
+		@param flushBytes: The number of bytes to collect before writing.
+		@return: The writer: close it when done.
+		'''
+		return ArgumentOutputWriter(self.useOut, ordered, 4 * max(1, self.threadCount()), flushBytes)
+	def memoryGate(self):
+		'''
+		Get the gate that keeps records read from a stream under the memory budget option.
+		@return: The gate, or None if there is no budget.
+		'''
+		memOpt = self.findOption(ArgumentOptionMemoryBudget)
+		if (memOpt is None) or (memOpt.value <= 0):
+			return None
+		if (self.memoryLimiter is None) or (self.memoryLimiter.maxBytes != memOpt.value):
+			self.memoryLimiter = ArgumentMemoryGate(memOpt.value)
+		return self.memoryLimiter
+	def autoGrain(self):
+		'''
+		Get whether the threadgrain should be picked by timing the work.
+		@return: Whether the threadgrain option was set to auto.
+		'''
+		grainOpt = self.findOption(ArgumentOptionThreadgrain)
+		return (grainOpt is not None) and grainOpt.isAuto
+	def calibrateGrain(self, loopFun, forItems, allRes, useProcess = False):
+		'''
+		Pick a threadgrain by timing the first few things, done here on this thread.
+		@param loopFun: The function being applied.
+		@param forItems: The things it is being applied to.
+		@param allRes: The place to put results for the things done here.
+		@param useProcess: Whether the work will be handed to processes instead of threads.
+		@return: The grain to use, and the number of things done here.
+		'''
+		numWorkers = self.threadCount()
+		chunkCost = self.timeChunkCost(useProcess)
+		# time the work, doubling up until there is enough to measure
+		maxWarm = max(1, len(forItems) // 16)
+		numDone = 0
+		workTime = 0.0
+		curSize = 1
+		while (numDone < maxWarm) and (workTime < 0.01):
+			endI = min(numDone + curSize, maxWarm)
+			startT = time.perf_counter()
+			for i in range(numDone, endI):
+				allRes[i] = loopFun(forItems[i])
+			workTime = workTime + (time.perf_counter() - startT)
+			numDone = endI
+			curSize = 2 * curSize
+		itemCost = max(workTime / numDone, 1e-9)
+		# small enough to keep everyone busy
+		maxGrain = max(1, (len(forItems) - numDone) // (4 * numWorkers))
+		return (self.pickGrain(chunkCost, itemCost, maxGrain), numDone)
+	def timeChunkCost(self, useProcess = False):
+		'''
+		Time how long it takes to hand a chunk of work to the pool and get it back.
+		@param useProcess: Whether the work will be handed to processes instead of threads.
+		@return: The time in seconds.
+		'''
+		curPool = self.getExecutor(useProcess)
+		curPool.submit(_mapChunk, len, []).result()
+		startT = time.perf_counter()
+		for i in range(8):
+			curPool.submit(_mapChunk, len, []).result()
+		return (time.perf_counter() - startT) / 8
+	def pickGrain(self, chunkCost, itemCost, maxGrain):
+		'''
+		Pick the smallest grain that hides the cost of handing out chunks, and put it in the threadgrain option.
+		@param chunkCost: The time to hand out a chunk, in seconds.
+		@param itemCost: The time to do one thing, in seconds.
+		@param maxGrain: The biggest grain to use, or None for no limit.
+		@return: The grain to use.
+		'''
+		grainOpt = self.findOption(ArgumentOptionThreadgrain)
+		maxOver = 0.02 if (grainOpt is None) else grainOpt.autoOverhead
+		useGrain = max(1, int(math.ceil((chunkCost * (1.0 - maxOver)) / (maxOver * itemCost))))
+		if maxGrain is not None:
+			useGrain = max(1, min(useGrain, maxGrain))
+		if grainOpt is not None:
+			grainOpt.value = useGrain
+		if self.timings is not None:
+			self.timings.note("Thread Grain", "auto picked " + str(useGrain) + (" (%.3f us per chunk, %.3f us per item)" % (1e6 * chunkCost, 1e6 * itemCost)))
+		return useGrain
 	def printHelp(self, toStr):
 		'''
 		Print help information on this thing.
@@ -914,6 +3840,70 @@ class StandardProgram:
 			subArg.dumpInfo(toStr)
 
 
+class AsyncStandardProgram(StandardProgram):
+	'''A program whose work is done in a coroutine, on an asyncio event loop.'''
+	def __init__(self):
+		'''
+		Set up an empty program.
+		'''
+		StandardProgram.__init__(self)
+		self.concurrency = None
+		'''Limits how many things run at once (sized by threadcount), while running.'''
+		self.asyncIn = None
+		'''useIn as an asyncio stream, while running.'''
+		self.asyncOut = None
+		'''useOut as an asyncio stream, while running.'''
+	def baseRun(self):
+		import asyncio
+		asyncio.run(self.runAsync())
+	async def runAsync(self):
+		'''
+		Set up the streams and the concurrency limit, and run baseRunAsync.
+		'''
+		import asyncio
+		self.concurrency = asyncio.Semaphore(max(1, self.threadCount()))
+		self.asyncIn = ArgumentAsyncReader(self.useIn)
+		self.asyncOut = ArgumentAsyncWriter(self.useOut)
+		try:
+			await self.baseRunAsync()
+		finally:
+			self.asyncIn.close()
+			await self.asyncOut.close()
+			self.asyncIn = None
+			self.asyncOut = None
+			self.concurrency = None
+	async def baseRunAsync(self):
+		'''
+		Actually do the thing.
+		'''
+		raise NotImplementedError("Use a subclass.")
+	async def limited(self, forAwait):
+		'''
+		Wait on something once there is room under the concurrency limit.
+		@param forAwait: The coroutine to run.
+		@return: Its result.
+		'''
+		async with self.concurrency:
+			return await forAwait
+	async def gatherLimited(self, allAwait):
+		'''
+		Run a bunch of coroutines, no more at once than the concurrency limit.
+		@param allAwait: The coroutines to run.
+		@return: Their results, in order.
+		'''
+		import asyncio
+		return await asyncio.gather(*[self.limited(curAw) for curAw in allAwait])
+	async def runBlocking(self, blockFun, *funArgs):
+		'''
+		Run a blocking function on the thread pool (which is already sized by threadcount).
+		@param blockFun: The function to run.
+		@param funArgs: The arguments to pass it.
+		@return: Its result.
+		'''
+		import asyncio
+		return await asyncio.get_running_loop().run_in_executor(self.getExecutor(False), blockFun, *funArgs)
+
+
 class StandardProgramSet:
 	'''A collection of programs.'''
 	def __init__(self):